@@ -1,11 +1,34 @@
+import asyncio
 import logging
-from datetime import datetime, timedelta
+import time
+from collections import deque
+from collections.abc import AsyncGenerator
+from datetime import datetime
 from typing import Any
 
-from app.http_client import AmoCRMHTTPClient
+from app.http_client import AmoCRMHTTPClient, http_client
+from app.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
+EVENTS_PAGE_LIMIT = 100
+
+
+def _yesterday_bounds() -> tuple[int, int]:
+    """
+    Границы вчерашних суток по локальному времени в виде unix timestamp.
+
+    Считается через time.mktime без создания объектов datetime;
+    переход на летнее/зимнее время учитывается самим mktime.
+
+    Returns:
+        tuple[int, int]: Начало вчерашних суток (00:00:00) и их конец (23:59:59)
+    """
+    now = time.localtime()
+    today_start = int(time.mktime((now.tm_year, now.tm_mon, now.tm_mday, 0, 0, 0, 0, 0, -1)))
+    yesterday_start = int(time.mktime((now.tm_year, now.tm_mon, now.tm_mday - 1, 0, 0, 0, 0, 0, -1)))
+    return yesterday_start, today_start - 1
+
 
 class AmoCRMClient:
     """
@@ -16,9 +39,14 @@ class AmoCRMClient:
     - Получения событий за период
     """
 
-    def __init__(self) -> None:
-        """Инициализация клиента."""
-        self.http_client = AmoCRMHTTPClient()
+    def __init__(self, client: AmoCRMHTTPClient | None = None) -> None:
+        """
+        Инициализация клиента.
+
+        Args:
+            client: HTTP-клиент (по умолчанию общий для процесса http_client)
+        """
+        self.http_client = client or http_client
 
     async def get_users(self) -> list[int]:
         """
@@ -31,18 +59,18 @@ class AmoCRMClient:
             Exception: При ошибках запроса
         """
         try:
-            async with self.http_client as client:
-                logger.info("Получение списка пользователей...")
+            logger.info("Получение списка пользователей...")
 
-                response = await client.get("/api/v4/users")
+            response = await self.http_client.get("/api/v4/users")
 
-                users = response.get("_embedded", {}).get("users", [])
-                user_ids = [user["id"] for user in users if "id" in user]
+            users = response.get("_embedded", {}).get("users", [])
+            user_ids = [user["id"] for user in users if "id" in user]
 
-                logger.info("Получено пользователей: %s", len(user_ids))
+            logger.info("Получено пользователей: %s", len(user_ids))
+            if logger.isEnabledFor(logging.DEBUG):
                 logger.debug("User IDs: %s", user_ids)
 
-                return user_ids
+            return user_ids
 
         except Exception as e:
             logger.error("Ошибка при получении списка пользователей: %s", e)
@@ -57,7 +85,7 @@ class AmoCRMClient:
         Получение событий из amoCRM за указанный период.
 
         По умолчанию загружает события за вчерашние сутки.
-        Использует постраничную загрузку для получения всех событий.
+        Собирает в список все страницы из iter_event_pages().
 
         Args:
             date_from: Начало периода (по умолчанию: вчера 00:00)
@@ -69,62 +97,108 @@ class AmoCRMClient:
         Raises:
             Exception: При ошибках запроса
         """
-        if date_from is None or date_to is None:
-            yesterday = datetime.now().date() - timedelta(days=1)
-            date_from = datetime.combine(yesterday, datetime.min.time())
-            date_to = datetime.combine(yesterday, datetime.max.time())
-
-        timestamp_from = int(date_from.timestamp())
-        timestamp_to = int(date_to.timestamp())
-
-        logger.info(
-            "Получение событий с %s по %s (timestamp: %s - %s)",
-            date_from.isoformat(),
-            date_to.isoformat(),
-            timestamp_from,
-            timestamp_to,
-        )
-
         all_events: list[dict[str, Any]] = []
-        page = 1
-        limit = 100
 
-        try:
-            async with self.http_client as client:
-                while True:
-                    logger.debug("Загрузка страницы %s событий...", page)
-
-                    params = {
-                        "filter[created_at][from]": timestamp_from,
-                        "filter[created_at][to]": timestamp_to,
-                        "page": page,
-                        "limit": limit,
-                    }
+        async for page_events in self.iter_event_pages(date_from=date_from, date_to=date_to):
+            all_events.extend(page_events)
 
-                    response = await client.get("/api/v4/events", params=params)
+        logger.info("Всего загружено событий: %s", len(all_events))
+        return all_events
 
-                    events = response.get("_embedded", {}).get("events", [])
+    async def iter_event_pages(
+        self,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+    ) -> AsyncGenerator[list[dict[str, Any]], None]:
+        """
+        Постраничная загрузка событий из amoCRM за указанный период.
 
-                    if not events:
-                        logger.debug("Страница %s пуста, загрузка завершена", page)
-                        break
+        По умолчанию загружает события за вчерашние сутки.
+        Страницы после первой запрашиваются параллельно: в работе всегда не больше
+        AMO_MAX_CONCURRENT_REQUESTS запросов, и как только отдана очередная страница,
+        запрашивается следующая. Страницы отдаются по порядку, поэтому в памяти одновременно
+        находится не больше AMO_MAX_CONCURRENT_REQUESTS ответов. Загрузка завершается на пустой
+        странице или по достижении _page_count, если API его вернул; без _page_count - на странице
+        без ссылки на следующую.
 
-                    all_events.extend(events)
-                    logger.debug("Загружено событий на странице %s: %s", page, len(events))
+        Args:
+            date_from: Начало периода (по умолчанию: вчера 00:00)
+            date_to: Конец периода (по умолчанию: вчера 23:59:59)
 
-                    links = response.get("_links", {})
-                    if "next" not in links:
-                        logger.debug("Следующей страницы нет, загрузка завершена")
-                        break
+        Yields:
+            list[dict[str, Any]]: События одной страницы
 
-                    page += 1
+        Raises:
+            Exception: При ошибках запроса
+        """
+        if date_from is None or date_to is None:
+            timestamp_from, timestamp_to = _yesterday_bounds()
+        else:
+            timestamp_from = int(date_from.timestamp())
+            timestamp_to = int(date_to.timestamp())
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Получение событий с %s по %s (timestamp: %s - %s)",
+                datetime.fromtimestamp(timestamp_from).isoformat(),
+                datetime.fromtimestamp(timestamp_to).isoformat(),
+                timestamp_from,
+                timestamp_to,
+            )
+
+        params: dict[str, Any] = {
+            "filter[created_at][from]": timestamp_from,
+            "filter[created_at][to]": timestamp_to,
+            "limit": EVENTS_PAGE_LIMIT,
+        }
+        concurrency = max(1, get_settings().AMO_MAX_CONCURRENT_REQUESTS)
+        pending: deque[asyncio.Task[dict[str, Any]]] = deque()
+
+        async def fetch_page(page: int) -> dict[str, Any]:
+            logger.debug("Загрузка страницы %s событий...", page)
+            return await self.http_client.get("/api/v4/events", params={**params, "page": page})
 
-                logger.info("Всего загружено событий: %s", len(all_events))
-                return all_events
+        try:
+            response = await fetch_page(1)
+            page_count = response.get("_page_count")
+            last_page = page_count if isinstance(page_count, int) else None
+            page = 1
+            next_page = 2
+
+            while True:
+                embedded = response.get("_embedded")
+                page_events = embedded.get("events", []) if embedded else []
+
+                if not page_events:
+                    logger.debug("Страница %s пуста, загрузка завершена", page)
+                    return
+
+                # Известный _page_count надежнее ссылки next: страницы за ним не запрашиваются вовсе
+                if last_page is not None:
+                    has_next = page < last_page
+                else:
+                    has_next = "next" in response.get("_links", {})
+                if has_next:
+                    while len(pending) < concurrency and (last_page is None or next_page <= last_page):
+                        pending.append(asyncio.create_task(fetch_page(next_page)))
+                        next_page += 1
+
+                logger.debug("Загружено событий на странице %s: %s", page, len(page_events))
+                yield page_events
+
+                if not has_next or not pending:
+                    logger.debug("Следующей страницы нет, загрузка завершена")
+                    return
+
+                page += 1
+                response = await pending.popleft()
 
         except Exception as e:
             logger.error("Ошибка при получении событий: %s", e)
             raise
+        finally:
+            for task in pending:
+                task.cancel()
 
     async def get_account_info(self) -> dict[str, Any]:
         """
@@ -139,11 +213,10 @@ class AmoCRMClient:
             Exception: При ошибках запроса
         """
         try:
-            async with self.http_client as client:
-                logger.debug("Запрос информации об аккаунте для замера latency...")
-                response = await client.get("/api/v4/account")
-                logger.debug("Получена информация об аккаунте")
-                return response
+            logger.debug("Запрос информации об аккаунте для замера latency...")
+            response = await self.http_client.get("/api/v4/account")
+            logger.debug("Получена информация об аккаунте")
+            return response
 
         except Exception as e:
             logger.error("Ошибка при получении информации об аккаунте: %s", e)
@@ -0,0 +1,32 @@
+import asyncio
+import logging
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
+try:
+    from uvloop import new_event_loop
+except ImportError:
+    new_event_loop = None  # type: ignore[assignment,unused-ignore]
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def run(main: Coroutine[Any, Any, T]) -> T:
+    """
+    Запуск корутины точки входа в новом event loop.
+
+    Если установлен uvloop, используется его event loop, иначе стандартный asyncio.
+
+    Args:
+        main: Корутина точки входа
+
+    Returns:
+        T: Результат корутины
+    """
+    if new_event_loop is None:
+        logger.debug("uvloop не установлен, используется стандартный event loop")
+
+    with asyncio.Runner(loop_factory=new_event_loop) as runner:
+        return runner.run(main)
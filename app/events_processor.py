@@ -1,12 +1,42 @@
+import heapq
 import logging
 from collections import Counter
+from collections.abc import AsyncIterable, Awaitable, Iterable, Iterator
+from operator import itemgetter
 from typing import Any
 
-from app.settings import settings
+from app.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
 
+def _automated_event_types(events: Iterable[dict[str, Any]], user_set: frozenset[int]) -> Iterator[str]:
+    """
+    Типы автоматических событий (created_by не входит в user_set).
+
+    Поля читаются индексированием с обработкой KeyError: у большинства событий
+    created_by и type присутствуют, и это дешевле, чем dict.get с значением по умолчанию.
+
+    Args:
+        events: События
+        user_set: ID пользователей аккаунта
+
+    Yields:
+        str: Тип события ("unknown", если тип не указан)
+    """
+    for event in events:
+        try:
+            if event["created_by"] in user_set:
+                continue
+        except KeyError:
+            pass
+
+        try:
+            yield event["type"]
+        except KeyError:
+            yield "unknown"
+
+
 class EventsProcessor:
     """
     Обработчик событий amoCRM.
@@ -24,12 +54,12 @@ class EventsProcessor:
         Args:
             top_limit: Количество топ событий для вывода (по умолчанию из настроек)
         """
-        self.top_limit = top_limit or settings.TOP_EVENTS_LIMIT
+        self.top_limit = top_limit or get_settings().TOP_EVENTS_LIMIT
 
     def filter_automated_events(
         self,
         events: list[dict[str, Any]],
-        user_ids: list[int],
+        user_ids: Iterable[int],
     ) -> list[dict[str, Any]]:
         """
         Фильтрация автоматических событий (исключение пользовательских действий).
@@ -44,13 +74,8 @@ class EventsProcessor:
         Returns:
             list[dict[str, Any]]: Список только автоматических событий
         """
-        automated_events = []
-
-        for event in events:
-            created_by = event.get("created_by")
-
-            if created_by is None or created_by not in user_ids:
-                automated_events.append(event)
+        user_set = frozenset(user_ids)
+        automated_events = [event for event in events if event.get("created_by") not in user_set]
 
         logger.info(
             "Всего событий: %s, пользовательских: %s, автоматических: %s",
@@ -65,18 +90,20 @@ class EventsProcessor:
         """
         Подсчет количества событий каждого типа.
 
+        Типы передаются в Counter генератором: подсчет выполняет его C-реализация
+        без промежуточного списка типов и копирования результата в dict.
+
         Args:
             events: Список событий
 
         Returns:
-            dict[str, int]: Словарь {тип_события: количество}
+            dict[str, int]: Словарь {тип_события: количество} (экземпляр Counter)
         """
-        event_types = [event.get("type", "unknown") for event in events]
-
-        type_counts = dict(Counter(event_types))
+        type_counts = Counter(event.get("type", "unknown") for event in events)
 
         logger.info("Найдено уникальных типов событий: %s", len(type_counts))
-        logger.debug("Подсчет по типам: %s", type_counts)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Подсчет по типам: %s", type_counts)
 
         return type_counts
 
@@ -97,26 +124,28 @@ class EventsProcessor:
         """
         limit = limit or self.top_limit
 
-        top_events = sorted(type_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+        top_events = heapq.nlargest(limit, type_counts.items(), key=itemgetter(1))
 
         logger.info("TOP-%s событий определен", limit)
-        for i, (event_type, count) in enumerate(top_events, 1):
-            logger.info("  %s. %s: %s", i, event_type, count)
+        for i, (event_type, event_count) in enumerate(top_events, 1):
+            logger.info("  %s. %s: %s", i, event_type, event_count)
 
         return top_events
 
     def process_events(
         self,
-        events: list[dict[str, Any]],
-        user_ids: list[int],
+        events: Iterable[dict[str, Any]],
+        user_ids: Iterable[int],
     ) -> list[tuple[str, int]]:
         """
         Полный цикл обработки событий.
 
-        Выполняет фильтрацию, подсчет и определение TOP-N.
+        Выполняет фильтрацию и подсчет за один проход по событиям,
+        затем определяет TOP-N. События могут приходить из генератора:
+        в памяти хранится только счетчик типов.
 
         Args:
-            events: Список всех событий
+            events: Все события (список или любой итерируемый объект)
             user_ids: Список ID пользователей
 
         Returns:
@@ -124,18 +153,88 @@ class EventsProcessor:
         """
         logger.info("Начало обработки событий...")
 
-        automated_events = self.filter_automated_events(events, user_ids)
+        user_set = frozenset(user_ids)
+        type_counts: Counter[str] = Counter()
+        total_count = 0
 
-        if not automated_events:
-            logger.warning("Не найдено автоматических событий")
-            return []
+        for event in events:
+            total_count += 1
+            if event.get("created_by") not in user_set:
+                type_counts[event.get("type", "unknown")] += 1
+
+        return self._finish_processing(type_counts, total_count)
 
-        type_counts = self.count_event_types(automated_events)
+    async def process_event_pages(
+        self,
+        pages: AsyncIterable[list[dict[str, Any]]],
+        user_ids: Iterable[int] | Awaitable[Iterable[int]],
+    ) -> list[tuple[str, int]]:
+        """
+        Потоковая обработка событий по страницам.
+
+        Счетчик типов обновляется по мере поступления страниц, поэтому в памяти
+        не хранится полный список событий за период.
+
+        user_ids можно передать задачей (например, asyncio.create_task(AmoCRMClient.get_users())):
+        она ожидается только после получения первой страницы, так что загрузка пользователей
+        и первой страницы событий идут параллельно.
+
+        Args:
+            pages: Асинхронный итератор страниц событий (например, AmoCRMClient.iter_event_pages())
+            user_ids: Список ID пользователей или awaitable, возвращающий его
+
+        Returns:
+            list[tuple[str, int]]: TOP-N событий [(тип, количество), ...]
+        """
+        logger.info("Начало потоковой обработки событий...")
+
+        pending_users: Awaitable[Iterable[int]] | None = None
+        user_set: frozenset[int] = frozenset()
+        if isinstance(user_ids, Awaitable):
+            pending_users = user_ids
+        else:
+            user_set = frozenset(user_ids)
+
+        type_counts: Counter[str] = Counter()
+        total_count = 0
+
+        async for events in pages:
+            if pending_users is not None:
+                user_set = frozenset(await pending_users)
+                pending_users = None
+            total_count += len(events)
+            type_counts.update(_automated_event_types(events, user_set))
+
+        if pending_users is not None:
+            await pending_users
+
+        return self._finish_processing(type_counts, total_count)
+
+    def _finish_processing(self, type_counts: Counter[str], total_count: int) -> list[tuple[str, int]]:
+        """
+        Логирование итогов подсчета и определение TOP-N.
+
+        Args:
+            type_counts: Количество автоматических событий по типам
+            total_count: Общее количество обработанных событий
+
+        Returns:
+            list[tuple[str, int]]: TOP-N событий [(тип, количество), ...]
+        """
+        automated_count = type_counts.total()
+        logger.info(
+            "Всего событий: %s, пользовательских: %s, автоматических: %s",
+            total_count,
+            total_count - automated_count,
+            automated_count,
+        )
 
         if not type_counts:
-            logger.warning("Не найдено типов событий для подсчета")
+            logger.warning("Не найдено автоматических событий")
             return []
 
+        logger.info("Найдено уникальных типов событий: %s", len(type_counts))
+
         top_events = self.get_top_events(type_counts)
 
         logger.info("Обработка событий завершена")
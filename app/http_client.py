@@ -1,19 +1,61 @@
 import logging
+import time
+from functools import cached_property
 from typing import Any
 
 import httpx
-from amocrm.v2 import tokens
 from tenacity import (
+    RetryCallState,
+    before_sleep_log,
     retry,
     retry_if_exception_type,
     stop_after_attempt,
     wait_exponential,
 )
 
-from app.settings import settings
+from app.settings import get_settings
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads  # type: ignore[assignment,unused-ignore]
 
 logger = logging.getLogger(__name__)
 
+RETRY_AFTER_MAX_SECONDS = 60.0
+
+# TTL кеша ответов по endpoint, секунды. Кеш срабатывает только при повторных запросах в одном процессе
+# (сервис main_daemon.py, ручной перезапуск отчёта в нем); одноразовые скрипты запрашивают /users один раз.
+# /api/v4/account не кешируется: по нему замеряется latency, и ответ из кеша исказил бы замер.
+CACHE_TTL_SECONDS: dict[str, float] = {
+    "/api/v4/users": 3600.0,
+}
+
+_exponential_wait = wait_exponential(multiplier=1, min=2, max=10)
+
+
+def _wait_retry_after(retry_state: RetryCallState) -> float:
+    """
+    Пауза перед повторной попыткой запроса.
+
+    Для ответа 429 использует заголовок Retry-After (не более RETRY_AFTER_MAX_SECONDS),
+    в остальных случаях - exponential backoff. Повтор с выбранной паузой логирует before_sleep_log.
+
+    Args:
+        retry_state: Состояние попытки tenacity
+
+    Returns:
+        float: Пауза в секундах
+    """
+    exc = retry_state.outcome.exception() if retry_state.outcome else None
+
+    if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429:
+        retry_after = exc.response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), RETRY_AFTER_MAX_SECONDS)
+
+    return _exponential_wait(retry_state)
+
 
 class AmoCRMHTTPClient:
     """
@@ -23,24 +65,70 @@ class AmoCRMHTTPClient:
     - Добавляет access_token в заголовки
     - Устанавливает таймауты
     - Повторяет запросы при временных ошибках (429, 500, 502, 503, 504)
-    - Использует exponential backoff между попытками
+    - Использует exponential backoff между попытками, для 429 учитывает Retry-After
+    - Переиспользует пул соединений (keep-alive) между запросами
+    - Кеширует ответы редко меняющихся endpoint (см. CACHE_TTL_SECONDS)
     """
 
     def __init__(self) -> None:
         """Инициализация HTTP-клиента."""
-        self.base_url = settings.AMO_BASE_URL.rstrip("/")
         self.timeout = httpx.Timeout(30.0, connect=10.0)
+        self.limits = httpx.Limits(max_connections=64, max_keepalive_connections=64)
         self._client: httpx.AsyncClient | None = None
+        self._cache: dict[tuple[str, tuple[tuple[str, Any], ...]], tuple[float, dict[str, Any]]] = {}
+
+    @cached_property
+    def base_url(self) -> str:
+        """Базовый URL аккаунта amoCRM (читается из настроек при первом запросе)."""
+        return get_settings().AMO_BASE_URL.rstrip("/")
 
     async def __aenter__(self) -> "AmoCRMHTTPClient":
-        """Вход в контекстный менеджер."""
-        self._client = httpx.AsyncClient(timeout=self.timeout)
+        """Вход в контекстный менеджер: эквивалент start()."""
+        await self.start()
         return self
 
     async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
-        """Выход из контекстного менеджера."""
-        if self._client:
+        """Выход из контекстного менеджера: эквивалент aclose()."""
+        await self.aclose()
+
+    async def start(self) -> None:
+        """
+        Создание пула соединений.
+
+        Вызывается один раз при запуске приложения. Если не вызван, пул создается при первом запросе.
+        """
+        self._ensure_client()
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        """
+        Получение httpx.AsyncClient, создает его при первом обращении.
+
+        Returns:
+            httpx.AsyncClient: Клиент с общим пулом соединений
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def aclose(self) -> None:
+        """Закрытие пула соединений. Вызывается один раз при завершении работы приложения."""
+        if self._client is not None:
             await self._client.aclose()
+            self._client = None
+
+    def invalidate(self, endpoint: str | None = None) -> None:
+        """
+        Сброс кеша ответов.
+
+        Args:
+            endpoint: Путь к endpoint (по умолчанию: сбрасывается весь кеш)
+        """
+        if endpoint is None:
+            self._cache.clear()
+            return
+
+        for key in [key for key in self._cache if key[0] == endpoint]:
+            del self._cache[key]
 
     def _get_access_token(self) -> str:
         """
@@ -52,6 +140,8 @@ class AmoCRMHTTPClient:
         Raises:
             RuntimeError: Если токен недоступен
         """
+        from amocrm.v2 import tokens  # pylint: disable=import-outside-toplevel
+
         try:
             token = tokens.default_token_manager.get_access_token()
             if not token:
@@ -72,10 +162,11 @@ class AmoCRMHTTPClient:
         Returns:
             dict[str, str]: Заголовки с Authorization
         """
-        if settings.AMO_LONG_LIVE_TOKEN:
+        long_live_token = get_settings().AMO_LONG_LIVE_TOKEN
+        if long_live_token:
             logger.debug("Использование долгосрочного токена")
             return {
-                "Authorization": f"Bearer {settings.AMO_LONG_LIVE_TOKEN}",
+                "Authorization": f"Bearer {long_live_token}",
                 "Content-Type": "application/json",
             }
 
@@ -89,13 +180,16 @@ class AmoCRMHTTPClient:
     @retry(
         retry=retry_if_exception_type((httpx.HTTPStatusError, httpx.RequestError)),
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
+        wait=_wait_retry_after,
+        before_sleep=before_sleep_log(logger, logging.WARNING),
         reraise=True,
     )
     async def get(self, endpoint: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
         """
         Выполнение GET-запроса к API amoCRM.
 
+        Для endpoint из CACHE_TTL_SECONDS ответ берется из кеша, пока не истек TTL.
+
         Args:
             endpoint: Путь к endpoint (например, "/api/v4/users")
             params: Query параметры
@@ -107,8 +201,16 @@ class AmoCRMHTTPClient:
             httpx.HTTPStatusError: При ошибках HTTP
             httpx.RequestError: При сетевых ошибках
         """
-        if not self._client:
-            raise RuntimeError("HTTP-клиент не инициализирован. Используйте async with.")
+        ttl = CACHE_TTL_SECONDS.get(endpoint)
+
+        if ttl is not None:
+            cache_key = (endpoint, tuple(sorted(params.items())) if params else ())
+            cached = self._cache.get(cache_key)
+            if cached is not None and cached[0] > time.monotonic():
+                logger.debug("Ответ для %s взят из кеша", endpoint)
+                return cached[1]
+
+        client = self._ensure_client()
 
         url = f"{self.base_url}{endpoint}"
         headers = self._get_headers()
@@ -116,16 +218,21 @@ class AmoCRMHTTPClient:
         logger.debug("GET %s, params=%s", url, params)
 
         try:
-            response = await self._client.get(url, headers=headers, params=params)
-
-            if response.status_code in (429, 500, 502, 503, 504):
-                logger.warning("Временная ошибка %s, повторяем запрос...", response.status_code)
-                response.raise_for_status()
+            response = await client.get(url, headers=headers, params=params)
 
             response.raise_for_status()
-            data = response.json()
 
-            logger.debug("Успешный ответ от %s: %s записей", endpoint, len(data.get("_embedded", {})))
+            if response.status_code == 204:
+                logger.debug("Пустой ответ (204) от %s", endpoint)
+                return {}
+
+            data = json_loads(response.content)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Успешный ответ от %s: %s записей", endpoint, len(data.get("_embedded", {})))
+
+            if ttl is not None:
+                self._cache[cache_key] = (time.monotonic() + ttl, data)
             return data  # type: ignore[no-any-return]
 
         except httpx.HTTPStatusError as e:
@@ -134,3 +241,6 @@ class AmoCRMHTTPClient:
         except httpx.RequestError as e:
             logger.error("Сетевая ошибка при запросе %s: %s", url, e)
             raise
+
+
+http_client = AmoCRMHTTPClient()
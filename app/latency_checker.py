@@ -1,14 +1,69 @@
+import asyncio
 import logging
 import os
 import sqlite3
 import time
-from datetime import UTC, datetime
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
 
 from app.amocrm_client import AmoCRMClient
 
 logger = logging.getLogger(__name__)
 
+# Тексты запросов вынесены в константы: sqlite3 кеширует подготовленные выражения
+# соединения по тексту SQL, так что каждое выражение компилируется один раз за время жизни LatencyChecker.
+SQL_INSERT = "INSERT INTO latency (timestamp, latency_ms) VALUES (?, ?)"
+SQL_MAX_FOR_DAY = """
+    SELECT timestamp, latency_ms
+    FROM latency
+    WHERE timestamp >= ? AND timestamp < ?
+    ORDER BY latency_ms DESC
+    LIMIT 1
+"""
+SQL_DELETE_FOR_DAY = "DELETE FROM latency WHERE timestamp >= ? AND timestamp < ?"
+SQL_SELECT_FOR_DAY = """
+    SELECT timestamp, latency_ms
+    FROM latency
+    WHERE timestamp >= ? AND timestamp < ?
+    ORDER BY timestamp
+"""
+
+
+def _iso_z(timestamp: datetime) -> str:
+    """
+    Форматирование timestamp в хранимый формат YYYY-MM-DDTHH:MM:SSZ.
+
+    Строка собирается из полей datetime, без разбора формата в strftime.
+
+    Args:
+        timestamp: Временная метка (UTC)
+
+    Returns:
+        str: Timestamp в формате ISO с суффиксом Z
+    """
+    return (
+        f"{timestamp.year:04d}-{timestamp.month:02d}-{timestamp.day:02d}"
+        f"T{timestamp.hour:02d}:{timestamp.minute:02d}:{timestamp.second:02d}Z"
+    )
+
+
+def _day_bounds(date: str) -> tuple[str, str]:
+    """
+    Границы суток в формате хранимых timestamp.
+
+    Сравнение строк ISO-формата совпадает с хронологическим порядком,
+    поэтому запросы по диапазону используют индекс по timestamp.
+
+    Args:
+        date: Дата в формате YYYY-MM-DD
+
+    Returns:
+        tuple[str, str]: Полуинтервал [начало суток, начало следующих суток)
+    """
+    day_start = datetime.strptime(date, "%Y-%m-%d")
+    return _iso_z(day_start), _iso_z(day_start + timedelta(days=1))
+
 
 class LatencyChecker:
     """
@@ -21,12 +76,17 @@ class LatencyChecker:
         )
     """
 
-    def __init__(self, db_path: str = "./db/latency.sqlite") -> None:
+    def __init__(
+        self,
+        db_path: str = "./db/latency.sqlite",
+        amocrm_client: AmoCRMClient | None = None,
+    ) -> None:
         """
         Инициализация LatencyChecker.
 
         Args:
             db_path: Путь к файлу базы данных SQLite
+            amocrm_client: Клиент amoCRM для замера (по умолчанию создается при первом замере)
         """
         if not Path(db_path).is_absolute():
             base_path = Path(__file__).parent.parent
@@ -36,28 +96,55 @@ class LatencyChecker:
 
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
 
+        self.amocrm_client = amocrm_client
+
+        self._conn = self._connect()
         self._init_database()
 
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Открытие постоянного соединения с базой данных.
+
+        Соединение работает в режиме autocommit и переиспользуется всеми методами.
+        Включается WAL-журнал, чтобы запись не требовала полного fsync на каждый commit,
+        и инкрементальный auto_vacuum, чтобы файл базы уменьшался после удаления записей.
+
+        Returns:
+            sqlite3.Connection: Соединение с базой данных
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        # Должен выполняться до включения WAL: режим записывается в заголовок только новой базы
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-20000")
+        conn.execute("PRAGMA journal_size_limit=67108864")
+        return conn
+
+    def close(self) -> None:
+        """Закрытие соединения с базой данных."""
+        self._conn.close()
+        logger.debug("Соединение с базой данных закрыто: %s", self.db_path)
+
     def _init_database(self) -> None:
         """Инициализация базы данных и создание таблицы."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute("""
+            self._conn.execute("""
                 CREATE TABLE IF NOT EXISTS latency (
                     timestamp TEXT NOT NULL,
                     latency_ms INTEGER NOT NULL
                 )
                 """)
 
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_latency_timestamp
-                ON latency(timestamp)
-                """)
+            # Индекс только по timestamp - префикс составного индекса и лишь замедлял вставки
+            self._conn.execute("DROP INDEX IF EXISTS idx_latency_timestamp")
 
-            conn.commit()
-            conn.close()
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_latency_timestamp_latency
+                ON latency(timestamp, latency_ms)
+                """)
 
             logger.info("База данных инициализирована: %s", self.db_path)
 
@@ -77,16 +164,17 @@ class LatencyChecker:
         Raises:
             Exception: При ошибках запроса
         """
-        client = AmoCRMClient()
+        if self.amocrm_client is None:
+            self.amocrm_client = AmoCRMClient()
+        client = self.amocrm_client
 
         try:
             logger.debug("Начало замера latency...")
-            start_time = time.time()
+            start_ns = time.perf_counter_ns()
 
             await client.get_account_info()
 
-            end_time = time.time()
-            latency_ms = int((end_time - start_time) * 1000)
+            latency_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
 
             logger.info("Замер latency выполнен: %s мс", latency_ms)
             return latency_ms
@@ -109,21 +197,43 @@ class LatencyChecker:
         if timestamp is None:
             timestamp = datetime.now(UTC)
 
-        timestamp_str = timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")
+        timestamp_str = _iso_z(timestamp)
 
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            self._conn.execute(SQL_INSERT, (timestamp_str, latency_ms))
 
-            cursor.execute(
-                "INSERT INTO latency (timestamp, latency_ms) VALUES (?, ?)",
-                (timestamp_str, latency_ms),
-            )
+            logger.info("Latency сохранен в БД: %s мс в %s", latency_ms, timestamp_str)
 
-            conn.commit()
-            conn.close()
+        except Exception as e:
+            logger.error("Ошибка при сохранении latency в БД: %s", e)
+            raise
 
-            logger.info("Latency сохранен в БД: %s мс в %s", latency_ms, timestamp_str)
+    def save_latency_many(self, items: Iterable[tuple[int, datetime | None]]) -> int:
+        """
+        Сохранение нескольких замеров latency одной транзакцией.
+
+        Args:
+            items: Пары (latency_ms, timestamp); timestamp None означает текущее время UTC
+
+        Returns:
+            int: Количество сохраненных записей
+
+        Raises:
+            Exception: При ошибках записи в БД
+        """
+        now = datetime.now(UTC)
+        rows = [(_iso_z(timestamp or now), latency_ms) for latency_ms, timestamp in items]
+
+        if not rows:
+            return 0
+
+        try:
+            with self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.executemany(SQL_INSERT, rows)
+
+            logger.info("Сохранено замеров latency в БД: %s", len(rows))
+            return len(rows)
 
         except Exception as e:
             logger.error("Ошибка при сохранении latency в БД: %s", e)
@@ -133,6 +243,8 @@ class LatencyChecker:
         """
         Замер latency и сохранение результата в БД.
 
+        Запись в SQLite выполняется в отдельном потоке, чтобы commit не блокировал event loop.
+
         Returns:
             int: Время отклика в миллисекундах
 
@@ -140,7 +252,7 @@ class LatencyChecker:
             Exception: При ошибках замера или сохранения
         """
         latency_ms = await self.measure_latency()
-        self.save_latency(latency_ms)
+        await asyncio.to_thread(self.save_latency, latency_ms)
         return latency_ms
 
     def get_max_latency_for_date(self, date: str) -> tuple[str, int] | None:
@@ -154,22 +266,9 @@ class LatencyChecker:
             tuple[str, int] | None: Кортеж (timestamp, max_latency_ms) или None если данных нет
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute(
-                """
-                SELECT timestamp, latency_ms
-                FROM latency
-                WHERE date(timestamp) = ?
-                ORDER BY latency_ms DESC
-                LIMIT 1
-                """,
-                (date,),
-            )
+            cursor = self._conn.execute(SQL_MAX_FOR_DAY, _day_bounds(date))
 
             result = cursor.fetchone()
-            conn.close()
 
             if result:
                 timestamp_str, latency_ms = result
@@ -183,6 +282,16 @@ class LatencyChecker:
             logger.error("Ошибка при получении максимального latency: %s", e)
             raise
 
+    def _compact(self) -> None:
+        """
+        Возврат освободившихся страниц и усечение WAL после удаления записей.
+
+        Без этого файл базы и WAL-журнал не уменьшаются после ежедневной очистки.
+        """
+        # incremental_vacuum освобождает одну страницу за шаг, а execute() делает только один шаг;
+        # executescript выполняет выражение до конца
+        self._conn.executescript("PRAGMA incremental_vacuum; PRAGMA wal_checkpoint(TRUNCATE);")
+
     def delete_latency_for_date(self, date: str) -> int:
         """
         Удаление записей latency за указанную дату.
@@ -194,58 +303,57 @@ class LatencyChecker:
             int: Количество удаленных записей
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute(
-                """
-                DELETE FROM latency
-                WHERE date(timestamp) = ?
-                """,
-                (date,),
-            )
+            cursor = self._conn.execute(SQL_DELETE_FOR_DAY, _day_bounds(date))
 
             deleted_count = cursor.rowcount
-            conn.commit()
-            conn.close()
 
             logger.info("Удалено записей latency за %s: %s", date, deleted_count)
+
+            if deleted_count > 0:
+                self._compact()
+
             return deleted_count
 
         except Exception as e:
             logger.error("Ошибка при удалении записей latency: %s", e)
             raise
 
-    def get_all_latency_for_date(self, date: str) -> list[tuple[str, int]]:
+    def iter_latency_for_date(self, date: str) -> Iterator[tuple[str, int]]:
         """
-        Получение всех замеров latency за указанную дату.
+        Потоковое чтение замеров latency за указанную дату.
+
+        Строки читаются из курсора по мере итерации, без загрузки всего результата в память.
 
         Args:
             date: Дата в формате YYYY-MM-DD
 
-        Returns:
-            list[tuple[str, int]]: Список кортежей (timestamp, latency_ms)
+        Yields:
+            tuple[str, int]: Кортеж (timestamp, latency_ms) в порядке timestamp
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute(
-                """
-                SELECT timestamp, latency_ms
-                FROM latency
-                WHERE date(timestamp) = ?
-                ORDER BY timestamp
-                """,
-                (date,),
-            )
+            cursor = self._conn.execute(SQL_SELECT_FOR_DAY, _day_bounds(date))
+            cursor.arraysize = 1000
 
-            results = cursor.fetchall()
-            conn.close()
-
-            logger.info("Получено замеров latency за %s: %s", date, len(results))
-            return results
+            while rows := cursor.fetchmany():
+                yield from rows
 
         except Exception as e:
             logger.error("Ошибка при получении замеров latency: %s", e)
             raise
+
+    def get_all_latency_for_date(self, date: str) -> list[tuple[str, int]]:
+        """
+        Получение всех замеров latency за указанную дату.
+
+        Для больших объемов используйте iter_latency_for_date().
+
+        Args:
+            date: Дата в формате YYYY-MM-DD
+
+        Returns:
+            list[tuple[str, int]]: Список кортежей (timestamp, latency_ms)
+        """
+        results = list(self.iter_latency_for_date(date))
+
+        logger.info("Получено замеров latency за %s: %s", date, len(results))
+        return results
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Долгоживущий сервис мониторинга событий amoCRM.
+
+Запускается как служба amocrm-monitor.service (Type=notify) и сам планирует задачи,
+сохраняя между запусками пул HTTP-соединений и авторизацию в Google Sheets.
+
+Выполняет:
+1. Инициализацию token manager и подключение к Google Sheets
+2. Замер latency в начале каждого часа (run_ping_probe)
+3. Формирование отчёта каждый день в CRON_RUN_TIME (run_daily_report)
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import sys
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+from typing import Any
+
+from app import event_loop
+from app.amocrm_client import AmoCRMClient
+from app.http_client import http_client
+from app.main_daily_report import run_daily_report
+from app.main_ping_probe import run_ping_probe
+from app.settings import get_settings
+from app.sheets_writer import sheets_writer
+
+logger = logging.getLogger(__name__)
+
+
+def seconds_until_next_hour(now: datetime) -> float:
+    """
+    Время до начала следующего часа.
+
+    Args:
+        now: Текущее время
+
+    Returns:
+        float: Количество секунд
+    """
+    next_run = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    return (next_run - now).total_seconds()
+
+
+def seconds_until_daily(now: datetime, run_time: str) -> float:
+    """
+    Время до ближайшего наступления времени суток run_time.
+
+    Args:
+        now: Текущее время
+        run_time: Время запуска в формате HH:MM
+
+    Returns:
+        float: Количество секунд
+    """
+    hour, minute = map(int, run_time.split(":"))
+    next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+def sd_notify(state: str) -> None:
+    """
+    Отправка уведомления systemd (протокол sd_notify).
+
+    Если сервис запущен не через systemd (NOTIFY_SOCKET не задан), ничего не делает.
+
+    Args:
+        state: Строка состояния, например "READY=1"
+    """
+    address = os.environ.get("NOTIFY_SOCKET")
+    if not address:
+        return
+
+    if address.startswith("@"):
+        address = "\0" + address[1:]
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(state.encode(), address)
+    except OSError as e:
+        logger.warning("Не удалось отправить уведомление systemd: %s", e)
+
+
+async def run_periodically(
+    name: str,
+    job: Callable[[], Awaitable[Any]],
+    delay: Callable[[datetime], float],
+) -> None:
+    """
+    Бесконечный цикл запуска задачи по расписанию.
+
+    Ошибки задачи логируются и не останавливают цикл.
+
+    Args:
+        name: Название задачи для логов
+        job: Задача
+        delay: Функция, возвращающая паузу до следующего запуска от текущего времени
+    """
+    while True:
+        pause = delay(datetime.now())
+        logger.info("Следующий запуск задачи '%s' через %.0f с", name, pause)
+        await asyncio.sleep(pause)
+
+        try:
+            await job()
+        except Exception as e:
+            logger.error("Ошибка при выполнении задачи '%s': %s", name, e, exc_info=True)
+
+
+async def main() -> None:  # pylint: disable=import-outside-toplevel
+    """Основная функция сервиса."""
+    settings = get_settings()
+    logging.basicConfig(
+        level=settings.log_level_value,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+        ],
+    )
+
+    try:
+        if settings.AMO_LONG_LIVE_TOKEN:
+            logger.info("Используется долгосрочный токен (OAuth2 не требуется)")
+        else:
+            logger.info("Инициализация token manager (OAuth2)...")
+            from app.token_manager import init_token_manager
+
+            init_token_manager()
+
+        await http_client.start()
+        await sheets_writer.connect()
+
+        amocrm_client = AmoCRMClient()
+
+        sd_notify("READY=1")
+        logger.info("Сервис мониторинга запущен, отчёт формируется ежедневно в %s", settings.CRON_RUN_TIME)
+
+        await asyncio.gather(
+            run_periodically("ping_probe", lambda: run_ping_probe(amocrm_client), seconds_until_next_hour),
+            run_periodically(
+                "daily_report",
+                lambda: run_daily_report(amocrm_client),
+                lambda now: seconds_until_daily(now, settings.CRON_RUN_TIME),
+            ),
+        )
+    finally:
+        sd_notify("STOPPING=1")
+        await http_client.aclose()
+
+
+if __name__ == "__main__":
+    event_loop.run(main())
@@ -2,42 +2,37 @@
 """
 Скрипт для ежедневного формирования отчёта по событиям amoCRM.
 
-Запускается автоматически каждый день в 03:00 через systemd timer (amocrm-daily-report.timer).
+Запускается автоматически каждый день в CRON_RUN_TIME сервисом main_daemon.py (amocrm-monitor.service).
 
 Выполняет:
 1. Определение даты отчёта (вчера)
-2. Получение user_ids
-3. Получение и обработка событий → TOP-5
-4. Получение максимального latency из SQLite
-5. Формирование данных для таблицы
-6. Запись в Google Sheets
-7. Удаление записей latency из SQLite
+2. Получение user_ids и подключение к Google Sheets параллельно с потоковой загрузкой и обработкой событий → TOP-5
+3. Получение максимального latency из SQLite
+4. Формирование данных для таблицы
+5. Запись в Google Sheets
+6. Удаление записей latency из SQLite
 """
 
 import asyncio
 import logging
 import sys
+from collections.abc import Mapping
+from contextlib import aclosing
 from datetime import datetime, timedelta
+from types import MappingProxyType
 from typing import Any
 
+from app import event_loop
 from app.amocrm_client import AmoCRMClient
 from app.events_processor import EventsProcessor
+from app.http_client import http_client
 from app.latency_checker import LatencyChecker
-from app.settings import settings
-from app.sheets_writer import sheets_writer
-from app.token_manager import init_token_manager
-
-logging.basicConfig(
-    level=settings.log_level_value,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-    ],
-)
+from app.settings import get_settings
+from app.sheets_writer import REPORT_HEADERS, sheets_writer
 
 logger = logging.getLogger(__name__)
 
-EVENT_TYPE_NAMES: dict[str, str] = {
+_EVENT_TYPE_NAMES: dict[str, str] = {
     "lead_added": "Новая сделка",
     "lead_deleted": "Сделка удалена",
     "lead_restored": "Сделка восстановлена",
@@ -100,6 +95,11 @@ EVENT_TYPE_NAMES: dict[str, str] = {
     "entity_merged": "Выполнено объединение",
 }
 
+# Неизменяемое представление: перевод типов не должен меняться во время работы.
+EVENT_TYPE_NAMES: Mapping[str, str] = MappingProxyType(_EVENT_TYPE_NAMES)
+
+_EVENT_NAME_GET = _EVENT_TYPE_NAMES.get
+
 
 def format_date(date: datetime) -> str:
     """
@@ -111,19 +111,25 @@ def format_date(date: datetime) -> str:
     Returns:
         str: Дата в формате DD.MM.YYYY
     """
-    return date.strftime("%d.%m.%Y")
+    return f"{date.day:02d}.{date.month:02d}.{date.year:04d}"
 
 
 def format_time(timestamp_str: str) -> str:
     """
     Форматирование времени из ISO timestamp.
 
+    Timestamp в формате, в котором его сохраняет LatencyChecker, разбирается срезом строки;
+    для остальных строк используется datetime.strptime.
+
     Args:
         timestamp_str: Timestamp в формате ISO (2025-01-15T18:23:00Z)
 
     Returns:
         str: Время в формате HH:MM
     """
+    if len(timestamp_str) == 20 and timestamp_str[10] == "T" and timestamp_str[13] == ":":
+        return timestamp_str[11:16]
+
     try:
         dt = datetime.strptime(timestamp_str, "%Y-%m-%dT%H:%M:%SZ")
         return dt.strftime("%H:%M")
@@ -142,7 +148,7 @@ def get_event_name(event_type: str) -> str:
     Returns:
         str: Русское название события или исходный тип, если перевод не найден
     """
-    return EVENT_TYPE_NAMES.get(event_type, event_type)
+    return _EVENT_NAME_GET(event_type, event_type)
 
 
 def prepare_report_data(
@@ -182,20 +188,31 @@ def prepare_report_data(
             rows.append([date_str, "Нет событий", 0, "", ""])
         return rows
 
-    for i, (event_type, count) in enumerate(top_events):
-        event_name = get_event_name(event_type)
-        if i == 0 and max_latency:
-            peak_time, latency_ms = max_latency
-            rows.append([date_str, event_name, count, latency_ms, format_time(peak_time)])
-        else:
-            rows.append([date_str, event_name, count, "", ""])
+    rows = [[date_str, get_event_name(event_type), count, "", ""] for event_type, count in top_events]
+    if max_latency:
+        peak_time, latency_ms = max_latency
+        rows[0][3:] = [latency_ms, format_time(peak_time)]
 
     logger.info("Подготовлено %s строк для отчёта за %s", len(rows), date_str)
     return rows
 
 
-async def main() -> None:  # pylint: disable=too-many-locals
-    """Основная функция для ежедневного формирования отчёта."""
+async def run_daily_report(amocrm_client: AmoCRMClient | None = None) -> None:  # pylint: disable=too-many-locals
+    """
+    Формирование и запись отчёта за вчерашний день.
+
+    Не настраивает авторизацию и не закрывает общий HTTP-клиент, поэтому
+    может вызываться повторно в долгоживущем процессе (см. main_daemon.py).
+
+    Args:
+        amocrm_client: Клиент amoCRM (по умолчанию создается новый)
+
+    Raises:
+        Exception: При ошибках на любом из шагов
+    """
+    latency_checker: LatencyChecker | None = None
+    sheets_task: asyncio.Task[None] | None = None
+
     try:
         logger.info("=" * 80)
         logger.info("Запуск ежедневного формирования отчёта по событиям amoCRM")
@@ -207,33 +224,32 @@ async def main() -> None:  # pylint: disable=too-many-locals
 
         logger.info("Дата отчёта: %s", format_date(report_date))
 
-        if settings.AMO_LONG_LIVE_TOKEN:
-            logger.info("Используется долгосрочный токен (OAuth2 не требуется)")
-        else:
-            logger.info("Инициализация token manager (OAuth2)...")
-            init_token_manager()
+        logger.info("Получение пользователей и событий за %s...", date_str)
+        amocrm_client = amocrm_client or AmoCRMClient()
+        users_task = asyncio.create_task(amocrm_client.get_users())
+        # Авторизация и открытие таблицы не зависят от событий и идут параллельно с их загрузкой
+        sheets_task = asyncio.create_task(sheets_writer.connect())
 
-        logger.info("Получение списка пользователей...")
-        amocrm_client = AmoCRMClient()
-        user_ids = await amocrm_client.get_users()
-        logger.info("Получено пользователей: %s", len(user_ids))
-
-        logger.info("Получение событий за %s...", date_str)
         date_from = report_date
-        date_to = datetime.combine(yesterday, datetime.max.time())
-        events = await amocrm_client.get_events(date_from=date_from, date_to=date_to)
-        logger.info("Получено событий: %s", len(events))
-
-        logger.info("Обработка событий...")
+        date_to = report_date + timedelta(days=1) - timedelta(seconds=1)
         processor = EventsProcessor()
-        top_events = processor.process_events(events, user_ids)
+        try:
+            # aclosing закрывает генератор и при ошибке обработки: незавершенные запросы страниц отменяются сразу
+            async with aclosing(amocrm_client.iter_event_pages(date_from=date_from, date_to=date_to)) as pages:
+                top_events = await processor.process_event_pages(pages, users_task)
+        except BaseException:
+            users_task.cancel()
+            raise
+
+        user_ids = await users_task
+        logger.info("Получено пользователей: %s", len(user_ids))
 
         if not top_events:
             logger.warning("Не найдено автоматических событий за %s", date_str)
 
         logger.info("Получение максимального latency из базы данных...")
         latency_checker = LatencyChecker()
-        max_latency = latency_checker.get_max_latency_for_date(date_str)
+        max_latency = await asyncio.to_thread(latency_checker.get_max_latency_for_date, date_str)
 
         if max_latency:
             peak_time, latency_ms = max_latency
@@ -245,29 +261,60 @@ async def main() -> None:  # pylint: disable=too-many-locals
         report_rows = prepare_report_data(report_date, top_events, max_latency)
 
         logger.info("Сформировано строк для записи: %s", len(report_rows))
-        for row in report_rows:
-            logger.debug("  %s", row)
-
-        headers = ["Дата", "Событие", "Кол-во", "Пиковая нагрузка (мс)", "Время пика"]
-        await sheets_writer.ensure_headers(headers)
+        if logger.isEnabledFor(logging.DEBUG):
+            for row in report_rows:
+                logger.debug("  %s", row)
 
         logger.info("Запись данных в Google Sheets...")
-        await sheets_writer.append_rows(report_rows)
+        await sheets_task
+        await sheets_writer.write_report(REPORT_HEADERS, report_rows)
         logger.info("Данные успешно записаны в таблицу")
 
         logger.info("Удаление обработанных данных latency из базы...")
-        deleted_count = latency_checker.delete_latency_for_date(date_str)
+        deleted_count = await asyncio.to_thread(latency_checker.delete_latency_for_date, date_str)
         logger.info("Удалено записей latency: %s", deleted_count)
 
         logger.info("=" * 80)
         logger.info("Ежедневный отчёт сформирован успешно за %s", format_date(report_date))
-        logger.info("Обработано событий: %s, TOP событий: %s", len(events), len(top_events))
+        logger.info("TOP событий в отчёте: %s", len(top_events))
         logger.info("=" * 80)
 
+    finally:
+        if sheets_task is not None:
+            sheets_task.cancel()
+        if latency_checker is not None:
+            latency_checker.close()
+
+
+async def main() -> None:  # pylint: disable=import-outside-toplevel
+    """Основная функция для ежедневного формирования отчёта."""
+    settings = get_settings()
+    logging.basicConfig(
+        level=settings.log_level_value,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+        ],
+    )
+
+    try:
+        if settings.AMO_LONG_LIVE_TOKEN:
+            logger.info("Используется долгосрочный токен (OAuth2 не требуется)")
+        else:
+            logger.info("Инициализация token manager (OAuth2)...")
+            from app.token_manager import init_token_manager
+
+            init_token_manager()
+
+        await http_client.start()
+        await run_daily_report()
+
     except Exception as e:
         logger.error("Критическая ошибка при формировании отчёта: %s", e, exc_info=True)
         sys.exit(1)
+    finally:
+        await http_client.aclose()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    event_loop.run(main())
@@ -2,7 +2,7 @@
 """
 Скрипт для почасового замера latency API amoCRM.
 
-Запускается автоматически каждый час через systemd timer (amocrm-ping-probe.timer).
+Запускается автоматически каждый час сервисом main_daemon.py (amocrm-monitor.service).
 
 Выполняет:
 1. Инициализацию token manager
@@ -10,50 +10,80 @@
 3. Сохранение результата в SQLite
 """
 
-import asyncio
 import logging
 import sys
 
+from app import event_loop
+from app.amocrm_client import AmoCRMClient
+from app.http_client import http_client
 from app.latency_checker import LatencyChecker
-from app.settings import settings
-from app.token_manager import init_token_manager
-
-logging.basicConfig(
-    level=settings.log_level_value,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-    ],
-)
+from app.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
 
-async def main() -> None:
-    """Основная функция для почасового замера latency."""
+async def run_ping_probe(amocrm_client: AmoCRMClient | None = None) -> int:
+    """
+    Замер latency и сохранение результата в SQLite.
+
+    Не настраивает авторизацию и не закрывает общий HTTP-клиент, поэтому
+    может вызываться повторно в долгоживущем процессе (см. main_daemon.py).
+
+    Args:
+        amocrm_client: Клиент amoCRM (по умолчанию создается новый)
+
+    Returns:
+        int: Время отклика в миллисекундах
+
+    Raises:
+        Exception: При ошибках замера или сохранения
+    """
+    logger.info("=" * 60)
+    logger.info("Запуск почасового замера latency API amoCRM")
+    logger.info("=" * 60)
+
+    checker = LatencyChecker(amocrm_client=amocrm_client)
+
     try:
-        logger.info("=" * 60)
-        logger.info("Запуск почасового замера latency API amoCRM")
-        logger.info("=" * 60)
+        latency_ms = await checker.measure_and_save()
+    finally:
+        checker.close()
 
+    logger.info("=" * 60)
+    logger.info("Почасовой замер latency завершен успешно: %s мс", latency_ms)
+    logger.info("=" * 60)
+    return latency_ms
+
+
+async def main() -> None:  # pylint: disable=import-outside-toplevel
+    """Основная функция для почасового замера latency."""
+    settings = get_settings()
+    logging.basicConfig(
+        level=settings.log_level_value,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+        ],
+    )
+
+    try:
         if settings.AMO_LONG_LIVE_TOKEN:
             logger.info("Используется долгосрочный токен (OAuth2 не требуется)")
         else:
             logger.info("Инициализация token manager (OAuth2)...")
-            init_token_manager()
-
-        checker = LatencyChecker()
+            from app.token_manager import init_token_manager
 
-        latency_ms = await checker.measure_and_save()
+            init_token_manager()
 
-        logger.info("=" * 60)
-        logger.info("Почасовой замер latency завершен успешно: %s мс", latency_ms)
-        logger.info("=" * 60)
+        await http_client.start()
+        await run_ping_probe()
 
     except Exception as e:
         logger.error("Критическая ошибка при замере latency: %s", e, exc_info=True)
         sys.exit(1)
+    finally:
+        await http_client.aclose()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    event_loop.run(main())
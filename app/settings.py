@@ -1,4 +1,5 @@
 import logging
+from functools import lru_cache
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -21,6 +22,11 @@ class Settings(BaseSettings):
         description="Базовый URL AmoCRM аккаунта (например: https://systemkov.amocrm.ru)",
     )
 
+    AMO_MAX_CONCURRENT_REQUESTS: int = Field(
+        default=5,
+        description="Максимум одновременных запросов к API amoCRM при постраничной загрузке",
+    )
+
     AMO_CLIENT_ID: str = Field(
         default="",
         description="Client ID интеграции AmoCRM (для OAuth2)",
@@ -74,8 +80,21 @@ class Settings(BaseSettings):
         return getattr(logging, self.LOG_LEVEL.upper(), logging.INFO)
 
 
-settings = Settings()  # type: ignore[call-arg]
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Получение настроек приложения.
+
+    Настройки читаются из окружения и .env при первом вызове и кешируются,
+    поэтому импорт модулей приложения не требует заданного окружения.
+
+    Returns:
+        Settings: Настройки приложения
+    """
+    settings = Settings()  # type: ignore[call-arg]
+
+    if not Path(settings.GOOGLE_SERVICE_ACCOUNT_PATH).is_absolute():
+        base_path = Path(__file__).parent.parent
+        settings.GOOGLE_SERVICE_ACCOUNT_PATH = str(base_path / settings.GOOGLE_SERVICE_ACCOUNT_PATH)
 
-if not Path(settings.GOOGLE_SERVICE_ACCOUNT_PATH).is_absolute():
-    base_path = Path(__file__).parent.parent
-    settings.GOOGLE_SERVICE_ACCOUNT_PATH = str(base_path / settings.GOOGLE_SERVICE_ACCOUNT_PATH)
+    return settings
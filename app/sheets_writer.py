@@ -1,15 +1,23 @@
 import asyncio
+import hashlib
 import logging
-import threading
+from collections.abc import Sequence
+from functools import cached_property
+from pathlib import Path
 from typing import Any
 
 import gspread
 from google.oauth2.service_account import Credentials
+from gspread.utils import absolute_range_name
 
-from app.settings import settings
+from app.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
+CACHE_DIR = Path(__file__).parent.parent / ".cache"
+
+REPORT_HEADERS: tuple[str, ...] = ("Дата", "Событие", "Кол-во", "Пиковая нагрузка (мс)", "Время пика")
+
 
 class SheetsWriter:
     """
@@ -21,10 +29,54 @@ class SheetsWriter:
 
     def __init__(self) -> None:
         """Инициализация клиента Google Sheets."""
-        self.spreadsheet_id = settings.SHEETS_ID
         self._client: gspread.Client | None = None
         self._worksheet: gspread.Worksheet | None = None
-        self._init_lock = threading.Lock()
+        self._init_lock = asyncio.Lock()
+        self.cache_dir = CACHE_DIR
+
+    @cached_property
+    def spreadsheet_id(self) -> str:
+        """ID Google-таблицы (читается из настроек при первом обращении)."""
+        return get_settings().SHEETS_ID
+
+    def _headers_marker_path(self) -> Path:
+        """Путь к файлу-маркеру проверенных заголовков таблицы."""
+        return self.cache_dir / f"headers_{self.spreadsheet_id}"
+
+    @staticmethod
+    def _headers_hash(headers: list[str]) -> str:
+        """Короткий хеш списка заголовков для файла-маркера."""
+        return hashlib.blake2b(repr(headers).encode()).hexdigest()[:16]
+
+    def _headers_marked(self, headers: list[str]) -> bool:
+        """
+        Проверка файла-маркера: заголовки уже были проверены или записаны ранее.
+
+        Args:
+            headers: Список заголовков колонок
+
+        Returns:
+            bool: True, если маркер есть и совпадает с хешем заголовков
+        """
+        try:
+            return self._headers_marker_path().read_text(encoding="utf-8") == self._headers_hash(headers)
+        except OSError:
+            return False
+
+    def _mark_headers(self, headers: list[str]) -> None:
+        """
+        Запись файла-маркера после успешной проверки или установки заголовков.
+
+        Ошибка записи не прерывает работу: заголовки будут проверены повторно при следующем запуске.
+
+        Args:
+            headers: Список заголовков колонок
+        """
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._headers_marker_path().write_text(self._headers_hash(headers), encoding="utf-8")
+        except OSError as e:
+            logger.warning("Не удалось сохранить маркер заголовков: %s", e)
 
     def _get_credentials(self) -> Credentials:
         """
@@ -41,20 +93,22 @@ class SheetsWriter:
             "https://www.googleapis.com/auth/drive",
         ]
 
+        service_account_path = get_settings().GOOGLE_SERVICE_ACCOUNT_PATH
+
         try:
             return Credentials.from_service_account_file(  # type: ignore[no-any-return,no-untyped-call]
-                settings.GOOGLE_SERVICE_ACCOUNT_PATH,
+                service_account_path,
                 scopes=scopes,
             )
         except FileNotFoundError as e:
-            logger.error("Файл service account не найден: %s", settings.GOOGLE_SERVICE_ACCOUNT_PATH)
-            raise FileNotFoundError(f"Service account файл не найден: {settings.GOOGLE_SERVICE_ACCOUNT_PATH}") from e
+            logger.error("Файл service account не найден: %s", service_account_path)
+            raise FileNotFoundError(f"Service account файл не найден: {service_account_path}") from e
 
     def _get_worksheet(self) -> gspread.Worksheet:
         """
-        Получение worksheet объекта.
+        Авторизация и открытие листа таблицы (блокирующие вызовы gspread).
 
-        Использует double-checked locking для thread-safety.
+        Вызывается из _ensure_worksheet() в отдельном потоке.
 
         Returns:
             gspread.Worksheet: Объект листа таблицы
@@ -64,21 +118,54 @@ class SheetsWriter:
             gspread.WorksheetNotFound: Если лист не найден
         """
         if self._worksheet is None:
-            with self._init_lock:
-                if self._worksheet is None:
-                    if self._client is None:
-                        credentials = self._get_credentials()
-                        self._client = gspread.authorize(credentials)
-                        logger.info("Авторизация в Google Sheets выполнена")
+            if self._client is None:
+                credentials = self._get_credentials()
+                self._client = gspread.authorize(credentials)
+                logger.info("Авторизация в Google Sheets выполнена")
 
-                    spreadsheet = self._client.open_by_key(self.spreadsheet_id)
-                    logger.info("Открыта таблица: %s", spreadsheet.title)
+            spreadsheet = self._client.open_by_key(self.spreadsheet_id)
+            logger.info("Открыта таблица: %s", spreadsheet.title)
 
-                    self._worksheet = spreadsheet.sheet1
-                    logger.info("Получен лист: %s", self._worksheet.title)
+            self._worksheet = spreadsheet.sheet1
+            logger.info("Получен лист: %s", self._worksheet.title)
 
         return self._worksheet
 
+    async def _ensure_worksheet(self) -> gspread.Worksheet:
+        """
+        Получение worksheet объекта с однократной инициализацией.
+
+        Все обращения к gspread идут из одного event loop, поэтому инициализацию
+        защищает asyncio.Lock; после нее лист берется из атрибута без блокировок.
+
+        Returns:
+            gspread.Worksheet: Объект листа таблицы
+
+        Raises:
+            gspread.SpreadsheetNotFound: Если таблица не найдена
+            gspread.WorksheetNotFound: Если лист не найден
+        """
+        if self._worksheet is not None:
+            return self._worksheet
+
+        async with self._init_lock:
+            if self._worksheet is not None:
+                return self._worksheet
+            return await asyncio.to_thread(self._get_worksheet)
+
+    async def connect(self) -> None:
+        """
+        Авторизация и открытие таблицы заранее, до первой записи.
+
+        Raises:
+            Exception: При ошибках авторизации или открытия таблицы
+        """
+        try:
+            await self._ensure_worksheet()
+        except Exception as e:
+            logger.error("Ошибка при подключении к Google Sheets: %s", e, exc_info=True)
+            raise
+
     async def append_rows(self, rows: list[list[Any]]) -> None:
         """
         Добавление строк в конец таблицы.
@@ -96,11 +183,8 @@ class SheetsWriter:
         try:
             logger.info("Добавление %s строк в Google Sheets...", len(rows))
 
-            def _append() -> None:
-                worksheet = self._get_worksheet()
-                worksheet.append_rows(rows, value_input_option="USER_ENTERED")  # type: ignore[arg-type]
-
-            await asyncio.to_thread(_append)
+            worksheet = await self._ensure_worksheet()
+            await asyncio.to_thread(worksheet.append_rows, rows, value_input_option="USER_ENTERED")  # type: ignore[arg-type]
 
             logger.info("Успешно добавлено %s строк в таблицу", len(rows))
 
@@ -108,12 +192,13 @@ class SheetsWriter:
             logger.error("Ошибка при добавлении строк в Google Sheets: %s", e, exc_info=True)
             raise
 
-    async def ensure_headers(self, headers: list[str]) -> None:
+    async def ensure_headers(self, headers: Sequence[str]) -> None:
         """
         Проверка и установка заголовков таблицы.
 
         Если первая строка пустая или не совпадает с ожидаемыми заголовками,
-        устанавливает правильные заголовки.
+        устанавливает правильные заголовки. Проверка пропускается, если заголовки
+        уже подтверждены файлом-маркером в .cache/.
 
         Args:
             headers: Список заголовков колонок
@@ -121,11 +206,18 @@ class SheetsWriter:
         Raises:
             Exception: При ошибках работы с Google Sheets
         """
+        headers = list(headers)
+
         try:
             logger.info("Проверка заголовков таблицы...")
 
+            worksheet = await self._ensure_worksheet()
+
             def _check_and_set_headers() -> None:
-                worksheet = self._get_worksheet()
+                if self._headers_marked(headers):
+                    logger.info("Заголовки подтверждены маркером, проверка пропущена")
+                    return
+
                 existing_headers = worksheet.row_values(1)
 
                 if not existing_headers or existing_headers != headers:
@@ -135,16 +227,92 @@ class SheetsWriter:
                 else:
                     logger.info("Заголовки уже установлены корректно")
 
+                self._mark_headers(headers)
+
             await asyncio.to_thread(_check_and_set_headers)
 
         except Exception as e:
             logger.error("Ошибка при проверке заголовков: %s", e, exc_info=True)
             raise
 
+    async def write_report(self, headers: Sequence[str], rows: list[list[Any]]) -> int:
+        """
+        Запись отчета: проверка заголовков и добавление строк за одно обращение к потоку.
+
+        Если таблица пустая (нет ни заголовков, ни данных в колонке A), заголовки и строки
+        записываются одним запросом values.batchUpdate. Иначе при несовпадении заголовки
+        перезаписываются в A1, а строки добавляются в конец таблицы.
+
+        После успешной записи сохраняется файл-маркер заголовков в .cache/; пока он совпадает
+        с headers, первая строка не запрашивается и строки сразу добавляются в конец таблицы.
+
+        Args:
+            headers: Список заголовков колонок
+            rows: Список строк для добавления. Каждая строка - список значений.
+
+        Returns:
+            int: Количество записанных строк данных по ответу Sheets API (без строки заголовков)
+
+        Raises:
+            Exception: При ошибках записи в Google Sheets
+        """
+        if not rows:
+            logger.warning("Попытка записать отчет без строк")
+            return 0
+
+        headers = list(headers)
+
+        try:
+            logger.info("Запись отчета (%s строк) в Google Sheets...", len(rows))
+
+            worksheet = await self._ensure_worksheet()
+
+            def _write() -> int:
+                if self._headers_marked(headers):
+                    response = worksheet.append_rows(rows, value_input_option="USER_ENTERED")  # type: ignore[arg-type]
+                    return int(response["updates"]["updatedRows"])
+
+                existing_headers = worksheet.row_values(1)
+
+                if not existing_headers and not worksheet.get_values("A2:A"):
+                    logger.info("Таблица пустая, запись заголовков и строк одним запросом")
+                    response = worksheet.spreadsheet.values_batch_update(
+                        {
+                            "valueInputOption": "USER_ENTERED",
+                            "data": [
+                                {"range": absolute_range_name(worksheet.title, "A1"), "values": [headers]},
+                                {"range": absolute_range_name(worksheet.title, "A2"), "values": rows},
+                            ],
+                        }
+                    )
+                    written = int(response["totalUpdatedRows"]) - 1
+                else:
+                    if existing_headers != headers:
+                        logger.info("Установка заголовков: %s", headers)
+                        worksheet.update([headers], "A1")
+
+                    response = worksheet.append_rows(rows, value_input_option="USER_ENTERED")  # type: ignore[arg-type]
+                    written = int(response["updates"]["updatedRows"])
+
+                self._mark_headers(headers)
+                return written
+
+            written = await asyncio.to_thread(_write)
+
+            logger.info("Отчет успешно записан: %s строк", written)
+            return written
+
+        except Exception as e:
+            logger.error("Ошибка при записи отчета в Google Sheets: %s", e, exc_info=True)
+            raise
+
     async def get_row_count(self) -> int:
         """
         Получение количества строк в таблице.
 
+        Считается по колонке A (дата заполнена в каждой строке отчета), поэтому
+        загружается одна колонка, а не весь лист.
+
         Returns:
             int: Количество строк (включая заголовки)
 
@@ -152,12 +320,8 @@ class SheetsWriter:
             Exception: При ошибках работы с Google Sheets
         """
         try:
-
-            def _get_count() -> int:
-                worksheet = self._get_worksheet()
-                return len(worksheet.get_all_values())
-
-            row_count: int = await asyncio.to_thread(_get_count)
+            worksheet = await self._ensure_worksheet()
+            row_count = len(await asyncio.to_thread(worksheet.col_values, 1))
             logger.debug("Количество строк в таблице: %s", row_count)
             return row_count
 
@@ -3,7 +3,7 @@ import os
 
 from amocrm.v2 import tokens
 
-from app.settings import settings
+from app.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +16,7 @@ def init_token_manager() -> None:
     выполняет первичную авторизацию при отсутствии токенов,
     дальнейшее обновление токенов выполняется автоматически.
     """
+    settings = get_settings()
     subdomain = settings.AMO_BASE_URL
 
     BASE_DIR = os.path.dirname(os.path.dirname(__file__))
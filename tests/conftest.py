@@ -0,0 +1,31 @@
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from app.settings import Settings, get_settings
+
+
+def _load_settings() -> Settings:
+    """Загрузка настроек для интеграционных тестов; без .env/переменных окружения тест пропускается."""
+    try:
+        return get_settings()
+    except ValidationError as e:
+        pytest.skip(f"Настройки приложения не заданы: {e.error_count()} ошибок валидации")
+
+
+@pytest.fixture
+def sheets_credentials() -> Settings:
+    """Пропуск теста, если не настроен service account Google Sheets (проверка до сетевых запросов)."""
+    settings = _load_settings()
+    if not Path(settings.GOOGLE_SERVICE_ACCOUNT_PATH).exists():
+        pytest.skip("Не найден service account для Google Sheets")
+    return settings
+
+
+@pytest.fixture
+def integration_credentials(sheets_credentials: Settings) -> Settings:
+    """Пропуск теста, если дополнительно не настроена авторизация amoCRM."""
+    if not (sheets_credentials.AMO_LONG_LIVE_TOKEN or sheets_credentials.AMO_CLIENT_ID):
+        pytest.skip("Не настроена авторизация amoCRM (AMO_LONG_LIVE_TOKEN или AMO_CLIENT_ID)")
+    return sheets_credentials
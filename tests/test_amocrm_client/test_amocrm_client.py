@@ -0,0 +1,132 @@
+import asyncio
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.amocrm_client import AmoCRMClient, _yesterday_bounds
+from app.http_client import AmoCRMHTTPClient
+from app.settings import get_settings
+
+
+class FakeEventsAPI:
+    """Эмуляция /api/v4/events: страница N содержит одно событие с id=N."""
+
+    def __init__(self, total_pages, page_count=None, no_content_from=None, last_link_page=None):
+        self.total_pages = total_pages
+        self.page_count = page_count
+        self.no_content_from = no_content_from
+        self.last_link_page = last_link_page
+        self.requested = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        self.requested.append(page)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001 * (page % 3))
+        self.in_flight -= 1
+
+        if page > self.total_pages or (self.no_content_from and page >= self.no_content_from):
+            return httpx.Response(204)
+
+        body = {"_embedded": {"events": [{"id": page, "type": "lead_added"}]}, "_links": {}}
+        last_link_page = self.last_link_page or self.total_pages
+        if page < last_link_page:
+            body["_links"]["next"] = {"href": f"?page={page + 1}"}
+        if self.page_count is not None:
+            body["_page_count"] = self.page_count
+        return httpx.Response(200, json=body)
+
+
+async def collect_pages(api, concurrency=3):
+    """Загрузка всех страниц через iter_event_pages с подмененным транспортом."""
+    http_client = AmoCRMHTTPClient()
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(api.handler))
+
+    try:
+        with (
+            patch.object(AmoCRMHTTPClient, "_get_headers", return_value={}),
+            patch.object(get_settings(), "AMO_MAX_CONCURRENT_REQUESTS", concurrency),
+        ):
+            client = AmoCRMClient(client=http_client)
+            return [[event["id"] for event in page] async for page in client.iter_event_pages()]
+    finally:
+        await http_client.aclose()
+
+
+class TestYesterdayBounds:
+    """Тесты расчета границ вчерашних суток."""
+
+    @pytest.mark.parametrize(
+        ("now", "yesterday"),
+        [
+            (datetime(2025, 1, 15, 12, 30), datetime(2025, 1, 14)),
+            (datetime(2025, 3, 1, 0, 5), datetime(2025, 2, 28)),
+            (datetime(2024, 3, 1, 23, 59), datetime(2024, 2, 29)),
+            (datetime(2025, 1, 1, 3, 0), datetime(2024, 12, 31)),
+        ],
+    )
+    def test_bounds(self, now, yesterday):
+        """Тест: границы совпадают с началом и концом вчерашних суток, в том числе на стыке месяцев и лет."""
+        with patch("app.amocrm_client.time.localtime", return_value=time.localtime(now.timestamp())):
+            timestamp_from, timestamp_to = _yesterday_bounds()
+
+        assert timestamp_from == int(yesterday.timestamp())
+        assert timestamp_to == int(datetime.combine(yesterday.date(), datetime.max.time()).timestamp())
+
+
+class TestIterEventPages:
+    """Тесты постраничной загрузки событий."""
+
+    async def test_single_page(self):
+        """Тест: страница без ссылки на следующую - единственный запрос."""
+        api = FakeEventsAPI(total_pages=1)
+
+        assert await collect_pages(api) == [[1]]
+        assert api.requested == [1]
+
+    async def test_pages_in_order(self):
+        """Тест: страницы отдаются по порядку, несмотря на параллельную загрузку."""
+        api = FakeEventsAPI(total_pages=7)
+
+        assert await collect_pages(api) == [[page] for page in range(1, 8)]
+
+    async def test_concurrency_limit(self):
+        """Тест: одновременно выполняется не больше AMO_MAX_CONCURRENT_REQUESTS запросов."""
+        api = FakeEventsAPI(total_pages=12)
+
+        await collect_pages(api, concurrency=3)
+
+        assert api.max_in_flight <= 3
+        assert sorted(set(api.requested))[:12] == list(range(1, 13))
+
+    async def test_page_count_limits_requests(self):
+        """Тест: при известном _page_count страницы за его пределами не запрашиваются."""
+        api = FakeEventsAPI(total_pages=4, page_count=4)
+
+        assert await collect_pages(api, concurrency=5) == [[1], [2], [3], [4]]
+        assert sorted(api.requested) == [1, 2, 3, 4]
+
+    async def test_page_count_overrides_next_link(self):
+        """Тест: ссылка next на последней по _page_count странице не приводит к лишним запросам."""
+        api = FakeEventsAPI(total_pages=10, page_count=3)
+
+        assert await collect_pages(api, concurrency=5) == [[1], [2], [3]]
+        assert sorted(api.requested) == [1, 2, 3]
+
+    async def test_stops_on_no_content(self):
+        """Тест: ответ 204 (пустая страница) завершает загрузку."""
+        api = FakeEventsAPI(total_pages=10, no_content_from=3)
+
+        assert await collect_pages(api) == [[1], [2]]
+
+    async def test_stops_without_next_link(self):
+        """Тест: страница без ссылки на следующую завершает загрузку."""
+        api = FakeEventsAPI(total_pages=10, last_link_page=2)
+
+        assert await collect_pages(api) == [[1], [2]]
@@ -0,0 +1,36 @@
+import asyncio
+from unittest.mock import patch
+
+from app import event_loop
+
+
+async def current_loop_type():
+    """Тип event loop, в котором выполняется корутина."""
+    return type(asyncio.get_running_loop())
+
+
+class TestRun:
+    """Тесты запуска точек входа."""
+
+    def test_default_loop_without_uvloop(self):
+        """Тест: без uvloop корутина выполняется в стандартном event loop."""
+        with patch.object(event_loop, "new_event_loop", None):
+            loop_type = event_loop.run(current_loop_type())
+
+        assert issubclass(loop_type, asyncio.BaseEventLoop)
+
+    def test_custom_loop_factory(self):
+        """Тест: если uvloop доступен, event loop создается его фабрикой."""
+        created = []
+
+        def factory():
+            loop = asyncio.new_event_loop()
+            created.append(loop)
+            return loop
+
+        with patch.object(event_loop, "new_event_loop", factory):
+            loop_type = event_loop.run(current_loop_type())
+
+        assert len(created) == 1
+        assert loop_type is type(created[0])
+        assert created[0].is_closed()
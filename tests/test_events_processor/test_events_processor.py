@@ -0,0 +1,116 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from app.events_processor import EventsProcessor
+
+
+@pytest.fixture
+def processor():
+    """Создание экземпляра EventsProcessor с TOP-3."""
+    return EventsProcessor(top_limit=3)
+
+
+@pytest.fixture
+def events():
+    """Набор событий: пользовательские, автоматические и без created_by."""
+    return [
+        {"id": 1, "type": "lead_added", "created_by": 10},
+        {"id": 2, "type": "lead_added", "created_by": 0},
+        {"id": 3, "type": "task_added", "created_by": 0},
+        {"id": 4, "type": "task_added", "created_by": 0},
+        {"id": 5, "type": "task_added", "created_by": 20},
+        {"id": 6, "type": "incoming_chat_message", "created_by": None},
+        {"id": 7, "type": "incoming_chat_message"},
+        {"id": 8, "type": "incoming_chat_message", "created_by": 0},
+        {"id": 9, "created_by": 0},
+    ]
+
+
+class TestFilterAutomatedEvents:
+    """Тесты фильтрации автоматических событий."""
+
+    def test_excludes_user_events(self, processor, events):
+        """Тест: события пользователей исключаются."""
+        result = processor.filter_automated_events(events, [10, 20])
+
+        assert [event["id"] for event in result] == [2, 3, 4, 6, 7, 8, 9]
+
+    def test_no_users(self, processor, events):
+        """Тест: без пользователей все события считаются автоматическими."""
+        result = processor.filter_automated_events(events, [])
+
+        assert len(result) == len(events)
+
+
+class TestGetTopEvents:
+    """Тесты определения TOP-N событий."""
+
+    def test_top_events_from_dict(self, processor):
+        """Тест: TOP-N из обычного словаря отсортирован по убыванию."""
+        type_counts = {"a": 1, "b": 5, "c": 3, "d": 4}
+
+        assert processor.get_top_events(type_counts) == [("b", 5), ("d", 4), ("c", 3)]
+
+    def test_top_events_from_counter(self, processor):
+        """Тест: TOP-N из Counter совпадает с результатом для словаря."""
+        type_counts = Counter({"a": 1, "b": 5, "c": 3, "d": 4})
+
+        assert processor.get_top_events(type_counts, limit=2) == [("b", 5), ("d", 4)]
+
+
+class TestProcessEvents:
+    """Тесты полного цикла обработки событий."""
+
+    def test_process_events(self, processor, events):
+        """Тест: фильтрация, подсчет и TOP-N за один вызов."""
+        result = processor.process_events(events, [10, 20])
+
+        assert result == [("incoming_chat_message", 3), ("task_added", 2), ("lead_added", 1)]
+
+    def test_process_events_unknown_type(self, events):
+        """Тест: события без типа учитываются как unknown."""
+        result = EventsProcessor(top_limit=10).process_events(events, [10, 20])
+
+        assert ("unknown", 1) in result
+
+    def test_process_events_only_user_events(self, processor):
+        """Тест: если все события пользовательские, возвращается пустой список."""
+        events = [{"id": 1, "type": "lead_added", "created_by": 10}]
+
+        assert processor.process_events(events, [10]) == []
+
+    def test_process_events_generator(self, processor, events, caplog):
+        """Тест: события можно передать генератором, общее количество считается при проходе."""
+        with caplog.at_level("INFO", logger="app.events_processor"):
+            result = processor.process_events((event for event in events), [10, 20])
+
+        assert result == processor.process_events(events, [10, 20])
+        assert "Всего событий: 9, пользовательских: 2, автоматических: 7" in caplog.text
+
+    async def test_process_event_pages(self, processor, events):
+        """Тест: потоковая обработка страниц совпадает с обработкой списка."""
+
+        async def pages():
+            yield events[:4]
+            yield events[4:]
+
+        result = await processor.process_event_pages(pages(), [10, 20])
+
+        assert result == processor.process_events(events, [10, 20])
+
+    async def test_process_event_pages_awaitable_users(self, processor, events):
+        """Тест: user_ids можно передать задачей, она ожидается при первой странице."""
+
+        async def get_users():
+            return [10, 20]
+
+        async def pages():
+            yield events
+
+        users_task = asyncio.create_task(get_users())
+        result = await processor.process_event_pages(pages(), users_task)
+
+        assert users_task.done()
+        assert result == processor.process_events(events, [10, 20])
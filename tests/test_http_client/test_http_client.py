@@ -0,0 +1,99 @@
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from app.http_client import RETRY_AFTER_MAX_SECONDS, AmoCRMHTTPClient, _wait_retry_after
+
+
+def make_retry_state(status_code: int, headers: dict[str, str] | None = None) -> MagicMock:
+    """Состояние первой попытки tenacity, завершившейся HTTP-ошибкой с указанным статусом."""
+    request = httpx.Request("GET", "https://example.amocrm.ru/api/v4/events")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    error = httpx.HTTPStatusError("error", request=request, response=response)
+
+    retry_state = MagicMock()
+    retry_state.attempt_number = 1
+    retry_state.outcome.exception.return_value = error
+    return retry_state
+
+
+class TestWaitRetryAfter:
+    """Тесты паузы перед повторной попыткой запроса."""
+
+    def test_retry_after_seconds(self):
+        """Тест: для 429 используется числовой Retry-After."""
+        assert _wait_retry_after(make_retry_state(429, {"Retry-After": "7"})) == 7
+
+    def test_retry_after_capped(self):
+        """Тест: слишком большой Retry-After ограничивается RETRY_AFTER_MAX_SECONDS."""
+        assert _wait_retry_after(make_retry_state(429, {"Retry-After": "3600"})) == RETRY_AFTER_MAX_SECONDS
+
+    @pytest.mark.parametrize(
+        "headers",
+        [{}, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}],
+    )
+    def test_retry_after_missing_or_date(self, headers):
+        """Тест: без числового Retry-After используется exponential backoff (минимум 2 с)."""
+        assert _wait_retry_after(make_retry_state(429, headers)) == 2
+
+    def test_not_rate_limited(self):
+        """Тест: для остальных ошибок Retry-After игнорируется."""
+        assert _wait_retry_after(make_retry_state(503, {"Retry-After": "30"})) == 2
+
+
+class TestAmoCRMHTTPClientCache:
+    """Тесты кеширования ответов AmoCRMHTTPClient."""
+
+    @pytest.fixture
+    def requests(self):
+        """Список путей, по которым были выполнены запросы."""
+        return []
+
+    @pytest.fixture
+    async def client(self, requests):
+        """Клиент с подмененным транспортом, отвечающим без обращения к сети."""
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request.url.path)
+            return httpx.Response(200, json={"_embedded": {"users": [{"id": len(requests)}]}})
+
+        http_client = AmoCRMHTTPClient()
+        http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        with patch.object(AmoCRMHTTPClient, "_get_headers", return_value={}):
+            yield http_client
+
+        await http_client.aclose()
+
+    async def test_users_cached(self, client, requests):
+        """Тест: повторный запрос /api/v4/users берется из кеша."""
+        first = await client.get("/api/v4/users")
+        second = await client.get("/api/v4/users")
+
+        assert first == second
+        assert requests == ["/api/v4/users"]
+
+    async def test_account_not_cached(self, client, requests):
+        """Тест: /api/v4/account всегда запрашивается заново (по нему замеряется latency)."""
+        await client.get("/api/v4/account")
+        await client.get("/api/v4/account")
+
+        assert requests == ["/api/v4/account", "/api/v4/account"]
+
+    async def test_cache_expired(self, client, requests):
+        """Тест: по истечении TTL запрос выполняется снова."""
+        await client.get("/api/v4/users")
+
+        with patch("app.http_client.time.monotonic", return_value=float("inf")):
+            await client.get("/api/v4/users")
+
+        assert len(requests) == 2
+
+    async def test_invalidate(self, client, requests):
+        """Тест: invalidate сбрасывает кеш endpoint."""
+        await client.get("/api/v4/users")
+        client.invalidate("/api/v4/users")
+        await client.get("/api/v4/users")
+
+        assert len(requests) == 2
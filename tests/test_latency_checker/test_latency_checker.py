@@ -1,12 +1,12 @@
 import os
 import sqlite3
 import tempfile
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from unittest.mock import AsyncMock, patch
 
 import pytest
 
-from app.latency_checker import LatencyChecker
+from app.latency_checker import SQL_DELETE_FOR_DAY, SQL_MAX_FOR_DAY, LatencyChecker, _day_bounds, _iso_z
 
 
 @pytest.fixture
@@ -20,7 +20,32 @@ def temp_db_path():
 @pytest.fixture
 def latency_checker(temp_db_path):
     """Создание экземпляра LatencyChecker с временной БД."""
-    return LatencyChecker(db_path=temp_db_path)
+    checker = LatencyChecker(db_path=temp_db_path)
+    yield checker
+    checker.close()
+
+
+@pytest.fixture
+def amocrm_client_class():
+    """Подмена AmoCRMClient в latency_checker; экземпляр клиента - AsyncMock (return_value)."""
+    with patch("app.latency_checker.AmoCRMClient", return_value=AsyncMock()) as client_class:
+        yield client_class
+
+
+class TestTimestampFormat:
+    """Тесты форматирования хранимых timestamp."""
+
+    @pytest.mark.parametrize(
+        "timestamp",
+        [datetime(2025, 1, 5, 3, 4, 5), datetime(2025, 12, 31, 23, 59, 59), datetime(999, 1, 1)],
+    )
+    def test_iso_z_matches_strftime(self, timestamp):
+        """Тест: _iso_z совпадает с форматом %Y-%m-%dT%H:%M:%SZ с ведущими нулями."""
+        assert _iso_z(timestamp) == f"{timestamp.year:04d}" + timestamp.strftime("-%m-%dT%H:%M:%SZ")
+
+    def test_day_bounds_year_end(self):
+        """Тест: верхняя граница суток переходит на следующий месяц и год."""
+        assert _day_bounds("2024-12-31") == ("2024-12-31T00:00:00Z", "2025-01-01T00:00:00Z")
 
 
 class TestLatencyCheckerInit:
@@ -51,21 +76,49 @@ class TestLatencyCheckerInit:
         assert result[0] == "latency"
 
     def test_init_creates_index(self, temp_db_path):
-        """Тест: инициализация создает индекс на timestamp."""
+        """Тест: инициализация создает составной индекс на (timestamp, latency_ms)."""
         checker = LatencyChecker(db_path=temp_db_path)
         
         conn = sqlite3.connect(temp_db_path)
         cursor = conn.cursor()
         
-        cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='index' AND name='idx_latency_timestamp'"
-        )
-        result = cursor.fetchone()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='latency'")
+        result = [row[0] for row in cursor.fetchall()]
         
         conn.close()
+        checker.close()
         
-        assert result is not None
-        assert result[0] == "idx_latency_timestamp"
+        assert result == ["idx_latency_timestamp_latency"]
+
+    @pytest.mark.parametrize("query", [SQL_MAX_FOR_DAY, SQL_DELETE_FOR_DAY])
+    def test_date_queries_use_index(self, latency_checker, query):
+        """Тест: запросы за дату выполняются диапазонным поиском по индексу, а не полным сканированием."""
+        plan = latency_checker._conn.execute(f"EXPLAIN QUERY PLAN {query}", _day_bounds("2025-01-15")).fetchall()
+        details = " ".join(row[-1] for row in plan)
+
+        assert "idx_latency_timestamp_latency (timestamp>? AND timestamp<?)" in details
+
+    def test_max_query_is_index_only(self, latency_checker):
+        """Тест: максимум за дату читается только из покрывающего индекса, без обращения к таблице."""
+        plan = latency_checker._conn.execute(f"EXPLAIN QUERY PLAN {SQL_MAX_FOR_DAY}", _day_bounds("2025-01-15")).fetchall()
+
+        assert "USING COVERING INDEX idx_latency_timestamp_latency" in plan[0][-1]
+
+    def test_init_enables_wal(self, latency_checker, temp_db_path):
+        """Тест: соединение использует WAL-журнал."""
+        conn = sqlite3.connect(temp_db_path)
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA journal_mode")
+        result = cursor.fetchone()
+        conn.close()
+
+        assert result[0] == "wal"
+
+    def test_init_sets_connection_pragmas(self, latency_checker):
+        """Тест: соединение настроено на synchronous=NORMAL, увеличенный page cache и инкрементальный auto_vacuum."""
+        assert latency_checker._conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        assert latency_checker._conn.execute("PRAGMA cache_size").fetchone()[0] == -20000
+        assert latency_checker._conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
 
     def test_init_with_relative_path(self):
         """Тест: инициализация с относительным путем."""
@@ -137,6 +190,32 @@ class TestSaveLatency:
         
         assert count == 3
 
+    def test_save_latency_many(self, latency_checker, temp_db_path):
+        """Тест: пакетное сохранение нескольких записей одной транзакцией."""
+        test_data = [
+            (100, datetime(2025, 1, 15, 10, 0, 0)),
+            (150, datetime(2025, 1, 15, 11, 0, 0)),
+            (200, None),
+        ]
+
+        saved = latency_checker.save_latency_many(test_data)
+
+        conn = sqlite3.connect(temp_db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT timestamp, latency_ms FROM latency ORDER BY timestamp")
+        results = cursor.fetchall()
+        conn.close()
+
+        assert saved == 3
+        assert len(results) == 3
+        assert results[0] == ("2025-01-15T10:00:00Z", 100)
+        assert results[1] == ("2025-01-15T11:00:00Z", 150)
+
+    def test_save_latency_many_empty(self, latency_checker):
+        """Тест: пакетное сохранение пустого списка ничего не записывает."""
+        assert latency_checker.save_latency_many([]) == 0
+        assert latency_checker.get_all_latency_for_date("2025-01-15") == []
+
 
 class TestGetMaxLatencyForDate:
     """Тесты получения максимального latency за дату."""
@@ -160,8 +239,7 @@ class TestGetMaxLatencyForDate:
             (200, datetime(2025, 1, 15, 13, 0, 0)),
         ]
         
-        for latency_ms, timestamp in test_data:
-            latency_checker.save_latency(latency_ms, timestamp)
+        latency_checker.save_latency_many(test_data)
         
         result = latency_checker.get_max_latency_for_date("2025-01-15")
         
@@ -178,8 +256,7 @@ class TestGetMaxLatencyForDate:
             (300, datetime(2025, 1, 16, 13, 0, 0)),
         ]
         
-        for latency_ms, timestamp in test_data:
-            latency_checker.save_latency(latency_ms, timestamp)
+        latency_checker.save_latency_many(test_data)
         
         result = latency_checker.get_max_latency_for_date("2025-01-15")
         
@@ -187,6 +264,17 @@ class TestGetMaxLatencyForDate:
         assert result[0] == "2025-01-15T11:00:00Z"
         assert result[1] == 250
 
+    def test_get_max_latency_day_boundaries(self, latency_checker):
+        """Тест: записи на границах суток относятся к своим датам."""
+        latency_checker.save_latency(100, datetime(2025, 1, 15, 0, 0, 0))
+        latency_checker.save_latency(200, datetime(2025, 1, 15, 23, 59, 59))
+        latency_checker.save_latency(300, datetime(2025, 1, 16, 0, 0, 0))
+
+        result = latency_checker.get_max_latency_for_date("2025-01-15")
+
+        assert result == ("2025-01-15T23:59:59Z", 200)
+        assert len(latency_checker.get_all_latency_for_date("2025-01-15")) == 2
+
     def test_get_max_latency_no_data(self, latency_checker):
         """Тест: получение максимального latency когда нет данных за дату."""
         result = latency_checker.get_max_latency_for_date("2025-01-15")
@@ -205,8 +293,7 @@ class TestDeleteLatencyForDate:
             (200, datetime(2025, 1, 15, 12, 0, 0)),
         ]
         
-        for latency_ms, timestamp in test_data:
-            latency_checker.save_latency(latency_ms, timestamp)
+        latency_checker.save_latency_many(test_data)
         
         deleted_count = latency_checker.delete_latency_for_date("2025-01-15")
         
@@ -224,8 +311,7 @@ class TestDeleteLatencyForDate:
             (300, datetime(2025, 1, 16, 13, 0, 0)),
         ]
         
-        for latency_ms, timestamp in test_data:
-            latency_checker.save_latency(latency_ms, timestamp)
+        latency_checker.save_latency_many(test_data)
         
         deleted_count = latency_checker.delete_latency_for_date("2025-01-15")
         
@@ -241,6 +327,16 @@ class TestDeleteLatencyForDate:
         assert result_tomorrow[0] == "2025-01-16T13:00:00Z"
         assert result_tomorrow[1] == 300
 
+    def test_delete_latency_compacts_database(self, latency_checker, temp_db_path):
+        """Тест: после удаления свободные страницы возвращаются, а WAL-журнал усекается."""
+        day_start = datetime(2025, 1, 15)
+        latency_checker.save_latency_many([(i, day_start + timedelta(seconds=i)) for i in range(5000)])
+
+        latency_checker.delete_latency_for_date("2025-01-15")
+
+        assert latency_checker._conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        assert os.path.getsize(f"{temp_db_path}-wal") == 0
+
     def test_delete_latency_no_data(self, latency_checker):
         """Тест: удаление когда нет данных за дату."""
         deleted_count = latency_checker.delete_latency_for_date("2025-01-15")
@@ -259,8 +355,7 @@ class TestGetAllLatencyForDate:
             (200, datetime(2025, 1, 15, 12, 0, 0)),
         ]
         
-        for latency_ms, timestamp in test_data:
-            latency_checker.save_latency(latency_ms, timestamp)
+        latency_checker.save_latency_many(test_data)
         
         results = latency_checker.get_all_latency_for_date("2025-01-15")
         
@@ -277,8 +372,7 @@ class TestGetAllLatencyForDate:
             (200, datetime(2025, 1, 15, 12, 0, 0)),
         ]
         
-        for latency_ms, timestamp in test_data:
-            latency_checker.save_latency(latency_ms, timestamp)
+        latency_checker.save_latency_many(test_data)
         
         results = latency_checker.get_all_latency_for_date("2025-01-15")
         
@@ -292,55 +386,62 @@ class TestGetAllLatencyForDate:
         
         assert len(results) == 0
 
+    def test_iter_latency_for_date(self, latency_checker):
+        """Тест: потоковое чтение возвращает те же записи, что и get_all_latency_for_date."""
+        for hour in range(5):
+            latency_checker.save_latency(100 + hour, datetime(2025, 1, 15, hour, 0, 0))
+
+        rows = latency_checker.iter_latency_for_date("2025-01-15")
+
+        assert not isinstance(rows, list)
+        assert list(rows) == latency_checker.get_all_latency_for_date("2025-01-15")
+
 
 class TestMeasureLatency:
     """Тесты замера latency."""
 
     @pytest.mark.asyncio
-    async def test_measure_latency_returns_milliseconds(self, latency_checker):
+    async def test_measure_latency_returns_milliseconds(self, latency_checker, amocrm_client_class):
         """Тест: замер latency возвращает значение в миллисекундах."""
-        mock_client = AsyncMock()
-        mock_client.get_account_info = AsyncMock()
-        
-        with patch("app.latency_checker.AmoCRMClient", return_value=mock_client):
-            latency_ms = await latency_checker.measure_latency()
-            
-            assert isinstance(latency_ms, int)
-            assert latency_ms >= 0
+        latency_ms = await latency_checker.measure_latency()
+
+        assert isinstance(latency_ms, int)
+        assert latency_ms >= 0
 
     @pytest.mark.asyncio
-    async def test_measure_latency_calls_get_account_info(self, latency_checker):
+    async def test_measure_latency_calls_get_account_info(self, latency_checker, amocrm_client_class):
         """Тест: замер latency вызывает get_account_info."""
-        mock_client = AsyncMock()
-        mock_client.get_account_info = AsyncMock()
-        
-        with patch("app.latency_checker.AmoCRMClient", return_value=mock_client):
-            await latency_checker.measure_latency()
-            
-            mock_client.get_account_info.assert_called_once()
+        await latency_checker.measure_latency()
+
+        amocrm_client_class.return_value.get_account_info.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_measure_latency_reuses_client(self, latency_checker, amocrm_client_class):
+        """Тест: клиент amoCRM создается при первом замере и переиспользуется дальше."""
+        await latency_checker.measure_latency()
+        await latency_checker.measure_latency()
+
+        amocrm_client_class.assert_called_once_with()
+        assert amocrm_client_class.return_value.get_account_info.await_count == 2
 
 
 class TestMeasureAndSave:
     """Тесты комбинированного метода measure_and_save."""
 
     @pytest.mark.asyncio
-    async def test_measure_and_save(self, latency_checker, temp_db_path):
+    async def test_measure_and_save(self, latency_checker, temp_db_path, amocrm_client_class):
         """Тест: measure_and_save замеряет и сохраняет latency."""
-        mock_client = AsyncMock()
-        mock_client.get_account_info = AsyncMock()
-        
-        with patch("app.latency_checker.AmoCRMClient", return_value=mock_client):
-            latency_ms = await latency_checker.measure_and_save()
-            
-            assert isinstance(latency_ms, int)
-            
-            conn = sqlite3.connect(temp_db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM latency")
-            count = cursor.fetchone()[0]
-            conn.close()
-            
-            assert count == 1
+        latency_ms = await latency_checker.measure_and_save()
+
+        assert isinstance(latency_ms, int)
+
+        conn = sqlite3.connect(temp_db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM latency")
+        count = cursor.fetchone()[0]
+        conn.close()
+
+        assert count == 1
 
 
 class TestComplexScenario:
@@ -372,8 +473,7 @@ class TestComplexScenario:
             (70, datetime(2025, 1, 15, 12, 0, 0)),
         ]
         
-        for latency_ms, timestamp in hourly_data:
-            latency_checker.save_latency(latency_ms, timestamp)
+        latency_checker.save_latency_many(hourly_data)
         
         all_records = latency_checker.get_all_latency_for_date(test_date)
         assert len(all_records) == 13
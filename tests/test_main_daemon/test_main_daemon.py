@@ -0,0 +1,57 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.main_daemon import (
+    run_periodically,
+    sd_notify,
+    seconds_until_daily,
+    seconds_until_next_hour,
+)
+
+
+class TestSchedule:
+    """Тесты расчета времени до следующего запуска."""
+
+    def test_seconds_until_next_hour(self):
+        """Тест: пауза до начала следующего часа."""
+        assert seconds_until_next_hour(datetime(2025, 1, 15, 10, 59, 30)) == 30
+        assert seconds_until_next_hour(datetime(2025, 1, 15, 10, 0, 0)) == 3600
+
+    def test_seconds_until_daily_today(self):
+        """Тест: время запуска еще не наступило сегодня."""
+        assert seconds_until_daily(datetime(2025, 1, 15, 2, 0, 0), "03:00") == 3600
+
+    def test_seconds_until_daily_tomorrow(self):
+        """Тест: время запуска уже прошло, следующий запуск завтра."""
+        assert seconds_until_daily(datetime(2025, 1, 15, 3, 0, 0), "03:00") == 24 * 3600
+        assert seconds_until_daily(datetime(2025, 12, 31, 23, 30, 0), "03:00") == 3.5 * 3600
+
+
+class TestRunPeriodically:
+    """Тесты цикла запуска задач."""
+
+    async def test_job_error_does_not_stop_loop(self):
+        """Тест: ошибка задачи логируется, цикл продолжается."""
+        job = AsyncMock(side_effect=[Exception("API Error"), None, asyncio.CancelledError()])
+
+        with patch("app.main_daemon.asyncio.sleep", new=AsyncMock()):
+            with pytest.raises(asyncio.CancelledError):
+                await run_periodically("test", job, lambda now: 0)
+
+        assert job.await_count == 3
+
+
+class TestSdNotify:
+    """Тесты уведомлений systemd."""
+
+    def test_without_notify_socket(self, monkeypatch):
+        """Тест: без NOTIFY_SOCKET уведомление не отправляется."""
+        monkeypatch.delenv("NOTIFY_SOCKET", raising=False)
+
+        with patch("app.main_daemon.socket.socket") as mock_socket:
+            sd_notify("READY=1")
+
+        mock_socket.assert_not_called()
@@ -1,6 +1,9 @@
+import logging
 import pytest
 from datetime import datetime, timedelta
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import DEFAULT, AsyncMock, MagicMock, patch
+
+from app.events_processor import EventsProcessor
 
 from app.main_daily_report import (
     format_date,
@@ -37,6 +40,12 @@ class TestFormatFunctions:
         result = format_time(timestamp)
         assert result == "00:00"
 
+    def test_format_time_not_zero_padded(self):
+        """Тест: timestamp без ведущих нулей разбирается через strptime."""
+        timestamp = "2025-1-5T8:03:00Z"
+        result = format_time(timestamp)
+        assert result == "08:03"
+
     def test_format_time_invalid(self):
         """Тест обработки невалидного timestamp."""
         timestamp = "invalid-timestamp"
@@ -121,6 +130,12 @@ class TestPrepareReportData:
         assert result[1] == ["11.11.2025", "Событие 2", 40, "", ""]
 
 
+async def no_pages(**kwargs):
+    """Пустой асинхронный генератор страниц событий."""
+    return
+    yield
+
+
 class TestMainIntegration:
     """
     Интеграционные тесты для функции main с моками зависимостей.
@@ -129,176 +144,139 @@ class TestMainIntegration:
     мокируя внешние зависимости (amoCRM API, SQLite, Google Sheets).
     """
 
+    @pytest.fixture
+    def mocks(self):
+        """
+        Подмена зависимостей main_daily_report одним patch.multiple.
+
+        Возвращает словарь моков: AmoCRMClient, EventsProcessor, LatencyChecker, sheets_writer
+        (их экземпляры - в return_value) и init_token_manager.
+        """
+        with (
+            patch("app.token_manager.init_token_manager") as mock_init_token,
+            patch.multiple(
+                "app.main_daily_report",
+                AmoCRMClient=DEFAULT,
+                EventsProcessor=DEFAULT,
+                LatencyChecker=DEFAULT,
+                sheets_writer=DEFAULT,
+            ) as mocks,
+        ):
+            mocks["init_token_manager"] = mock_init_token
+
+            mock_amocrm_client = mocks["AmoCRMClient"].return_value = AsyncMock()
+            mock_amocrm_client.get_users.return_value = [1, 2, 3]
+            mock_amocrm_client.iter_event_pages = MagicMock(side_effect=no_pages)
+
+            mock_processor = mocks["EventsProcessor"].return_value
+            mock_processor.process_event_pages = AsyncMock(return_value=[])
+
+            mock_latency_checker = mocks["LatencyChecker"].return_value
+            mock_latency_checker.get_max_latency_for_date.return_value = None
+            mock_latency_checker.delete_latency_for_date.return_value = 0
+
+            mocks["sheets_writer"].connect = AsyncMock()
+            mocks["sheets_writer"].write_report = AsyncMock()
+
+            yield mocks
+
+    @staticmethod
+    def written_rows(mocks):
+        """Строки, переданные в sheets_writer.write_report."""
+        mocks["sheets_writer"].write_report.assert_called_once()
+        return mocks["sheets_writer"].write_report.call_args[0][1]
+
     @pytest.mark.asyncio
-    @patch("app.main_daily_report.settings")
-    @patch("app.main_daily_report.init_token_manager")
-    @patch("app.main_daily_report.AmoCRMClient")
-    @patch("app.main_daily_report.EventsProcessor")
-    @patch("app.main_daily_report.LatencyChecker")
-    @patch("app.main_daily_report.sheets_writer")
-    async def test_main_success_full_flow(
-        self,
-        mock_sheets_writer,
-        mock_latency_checker_class,
-        mock_processor_class,
-        mock_amocrm_client_class,
-        mock_init_token,
-        mock_settings,
-    ):
+    @patch("app.main_daily_report.get_settings")
+    async def test_main_success_full_flow(self, mock_get_settings, mocks):
         """Тест успешного выполнения полного процесса формирования отчёта."""
-        mock_settings.AMO_LONG_LIVE_TOKEN = None
-        
-        mock_amocrm_client = AsyncMock()
-        mock_amocrm_client.get_users.return_value = [1, 2, 3]
-        mock_amocrm_client.get_events.return_value = [
-            {"id": 1, "type": "incoming_message", "created_by": None},
-            {"id": 2, "type": "task_added", "created_by": None},
-            {"id": 3, "type": "task_added", "created_by": None},
-        ]
-        mock_amocrm_client_class.return_value = mock_amocrm_client
+        mock_get_settings.return_value.AMO_LONG_LIVE_TOKEN = None
+        mock_get_settings.return_value.log_level_value = logging.INFO
 
-        mock_processor = MagicMock()
-        mock_processor.process_events.return_value = [
+        mock_amocrm_client = mocks["AmoCRMClient"].return_value
+        mock_processor = mocks["EventsProcessor"].return_value
+        mock_processor.process_event_pages.return_value = [
             ("task_added", 2),
             ("incoming_message", 1),
         ]
-        mock_processor_class.return_value = mock_processor
-
-        mock_latency_checker = MagicMock()
+        mock_latency_checker = mocks["LatencyChecker"].return_value
         mock_latency_checker.get_max_latency_for_date.return_value = (
             "2025-11-10T15:30:00Z",
             85,
         )
         mock_latency_checker.delete_latency_for_date.return_value = 24
-        mock_latency_checker_class.return_value = mock_latency_checker
-
-        mock_sheets_writer.ensure_headers = AsyncMock()
-        mock_sheets_writer.append_rows = AsyncMock()
 
         await main()
 
-        mock_init_token.assert_called_once()
+        mocks["init_token_manager"].assert_called_once()
         mock_amocrm_client.get_users.assert_called_once()
-        mock_amocrm_client.get_events.assert_called_once()
-        mock_processor.process_events.assert_called_once()
+        mock_amocrm_client.iter_event_pages.assert_called_once()
+        mock_processor.process_event_pages.assert_awaited_once()
         mock_latency_checker.get_max_latency_for_date.assert_called_once()
-        mock_sheets_writer.ensure_headers.assert_called_once()
-        mock_sheets_writer.append_rows.assert_called_once()
+        mocks["sheets_writer"].connect.assert_awaited_once()
         mock_latency_checker.delete_latency_for_date.assert_called_once()
 
-        call_args = mock_sheets_writer.append_rows.call_args
-        rows = call_args[0][0]
+        rows = self.written_rows(mocks)
         assert len(rows) == 2
-        assert rows[0][1] == "task_added"
+        assert rows[0][1] == "Новая задача"
         assert rows[0][3] == 85
         assert rows[1][3] == ""
 
     @pytest.mark.asyncio
-    @patch("app.main_daily_report.init_token_manager")
-    @patch("app.main_daily_report.AmoCRMClient")
-    @patch("app.main_daily_report.EventsProcessor")
-    @patch("app.main_daily_report.LatencyChecker")
-    @patch("app.main_daily_report.sheets_writer")
-    async def test_main_no_events(
-        self,
-        mock_sheets_writer,
-        mock_latency_checker_class,
-        mock_processor_class,
-        mock_amocrm_client_class,
-        mock_init_token,
-    ):
+    async def test_main_no_events(self, mocks):
         """Тест обработки случая, когда нет событий."""
-        mock_amocrm_client = AsyncMock()
-        mock_amocrm_client.get_users.return_value = [1, 2, 3]
-        mock_amocrm_client.get_events.return_value = []
-        mock_amocrm_client_class.return_value = mock_amocrm_client
-
-        mock_processor = MagicMock()
-        mock_processor.process_events.return_value = []
-        mock_processor_class.return_value = mock_processor
-
-        mock_latency_checker = MagicMock()
-        mock_latency_checker.get_max_latency_for_date.return_value = (
+        mocks["LatencyChecker"].return_value.get_max_latency_for_date.return_value = (
             "2025-11-10T10:00:00Z",
             50,
         )
-        mock_latency_checker.delete_latency_for_date.return_value = 24
-        mock_latency_checker_class.return_value = mock_latency_checker
-
-        mock_sheets_writer.ensure_headers = AsyncMock()
-        mock_sheets_writer.append_rows = AsyncMock()
 
         await main()
 
-        mock_sheets_writer.append_rows.assert_called_once()
-        call_args = mock_sheets_writer.append_rows.call_args
-        rows = call_args[0][0]
+        rows = self.written_rows(mocks)
         assert len(rows) == 1
         assert rows[0][1] == "Нет событий"
         assert rows[0][2] == 0
         assert rows[0][3] == 50
 
     @pytest.mark.asyncio
-    @patch("app.main_daily_report.init_token_manager")
-    @patch("app.main_daily_report.AmoCRMClient")
-    @patch("app.main_daily_report.EventsProcessor")
-    @patch("app.main_daily_report.LatencyChecker")
-    @patch("app.main_daily_report.sheets_writer")
-    async def test_main_no_latency(
-        self,
-        mock_sheets_writer,
-        mock_latency_checker_class,
-        mock_processor_class,
-        mock_amocrm_client_class,
-        mock_init_token,
-    ):
+    async def test_main_no_latency(self, mocks):
         """Тест обработки случая, когда нет данных о latency."""
-        mock_amocrm_client = AsyncMock()
-        mock_amocrm_client.get_users.return_value = [1, 2, 3]
-        mock_amocrm_client.get_events.return_value = [
-            {"id": 1, "type": "event1", "created_by": None},
-        ]
-        mock_amocrm_client_class.return_value = mock_amocrm_client
-
-        mock_processor = MagicMock()
-        mock_processor.process_events.return_value = [("event1", 1)]
-        mock_processor_class.return_value = mock_processor
-
-        mock_latency_checker = MagicMock()
-        mock_latency_checker.get_max_latency_for_date.return_value = None
-        mock_latency_checker.delete_latency_for_date.return_value = 0
-        mock_latency_checker_class.return_value = mock_latency_checker
-
-        mock_sheets_writer.ensure_headers = AsyncMock()
-        mock_sheets_writer.append_rows = AsyncMock()
+        mocks["EventsProcessor"].return_value.process_event_pages.return_value = [("event1", 1)]
 
         await main()
 
-        mock_sheets_writer.append_rows.assert_called_once()
-        call_args = mock_sheets_writer.append_rows.call_args
-        rows = call_args[0][0]
+        rows = self.written_rows(mocks)
         assert len(rows) == 1
         assert rows[0][1] == "event1"
         assert rows[0][3] == ""
         assert rows[0][4] == ""
 
     @pytest.mark.asyncio
-    @patch("app.main_daily_report.init_token_manager")
-    @patch("app.main_daily_report.AmoCRMClient")
     @patch("sys.exit")
-    async def test_main_error_handling(
-        self, mock_exit, mock_amocrm_client_class, mock_init_token
-    ):
-        """Тест обработки критических ошибок."""
-        mock_amocrm_client = AsyncMock()
+    async def test_main_error_handling(self, mock_exit, mocks):
+        """Тест обработки критических ошибок: отчет не записывается, генератор страниц закрыт, код выхода 1."""
+        closed = []
+
+        async def pages(**kwargs):
+            try:
+                yield [{"id": 1, "type": "task_added", "created_by": None}]
+                yield [{"id": 2, "type": "task_added", "created_by": None}]
+            finally:
+                closed.append(True)
+
+        mocks["EventsProcessor"].return_value = EventsProcessor()
+        mock_amocrm_client = mocks["AmoCRMClient"].return_value
         mock_amocrm_client.get_users.side_effect = Exception("API Error")
-        mock_amocrm_client_class.return_value = mock_amocrm_client
+        mock_amocrm_client.iter_event_pages = MagicMock(side_effect=pages)
 
         await main()
 
         mock_exit.assert_called_once_with(1)
+        mocks["sheets_writer"].write_report.assert_not_called()
+        assert closed == [True]
 
 
+@pytest.mark.usefixtures("sheets_credentials")
 class TestMainRealIntegration:
     """
     Реальный интеграционный тест для main_daily_report.
@@ -339,14 +317,15 @@ class TestMainRealIntegration:
 
         mock_amocrm_client = AsyncMock()
         mock_amocrm_client.get_users.return_value = [1, 2, 3, 4, 5]
-        mock_amocrm_client.get_events.return_value = [
-            {"id": i, "type": f"test_event_{i % 5 + 1}", "created_by": None}
-            for i in range(50)
-        ]
+        async def pages(**kwargs):
+            yield [{"id": i, "type": f"test_event_{i % 5 + 1}", "created_by": None} for i in range(50)]
+
+        mock_amocrm_client.iter_event_pages = MagicMock(side_effect=pages)
         mock_amocrm_client_class.return_value = mock_amocrm_client
 
         mock_processor = MagicMock()
-        mock_processor.process_events.return_value = [
+        mock_processor.process_event_pages = AsyncMock()
+        mock_processor.process_event_pages.return_value = [
             ("TEST: Входящее сообщение", 20),
             ("TEST: Задача добавлена", 15),
             ("TEST: Смена ответственного", 10),
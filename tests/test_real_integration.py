@@ -26,12 +26,16 @@ import pytest
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from app import event_loop
 from app.amocrm_client import AmoCRMClient
 from app.events_processor import EventsProcessor
 from app.latency_checker import LatencyChecker
 from app.main_daily_report import format_date, format_time, prepare_report_data
-from app.settings import settings
-from app.sheets_writer import sheets_writer
+from app.settings import get_settings
+from app.sheets_writer import REPORT_HEADERS, sheets_writer
+
+# Дешевая проверка до сетевых запросов: без настроек и credentials тест пропускается сразу, а не падает по таймауту
+pytestmark = pytest.mark.usefixtures("integration_credentials")
 
 logging.basicConfig(
     level=logging.INFO,
@@ -41,7 +45,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def _test_users():
+async def _test_users(client):
     """Тест получения списка пользователей."""
     logger.info("")
     logger.info("=" * 80)
@@ -49,7 +53,6 @@ async def _test_users():
     logger.info("=" * 80)
     
     try:
-        client = AmoCRMClient()
         user_ids = await client.get_users()
         
         logger.info("Успешно получено пользователей: %s", len(user_ids))
@@ -61,7 +64,7 @@ async def _test_users():
         return False, []
 
 
-async def _test_events(user_ids):
+async def _test_events(client, user_ids):
     """Тест получения и обработки событий."""
     logger.info("")
     logger.info("=" * 80)
@@ -69,7 +72,6 @@ async def _test_events(user_ids):
     logger.info("=" * 80)
     
     try:
-        client = AmoCRMClient()
         now = datetime.now()
         one_hour_ago = now - timedelta(hours=1)
         
@@ -88,7 +90,7 @@ async def _test_events(user_ids):
         processor = EventsProcessor()
         top_events = processor.process_events(events, user_ids)
         
-        logger.info("TOP-%s автоматических событий:", settings.TOP_EVENTS_LIMIT)
+        logger.info("TOP-%s автоматических событий:", get_settings().TOP_EVENTS_LIMIT)
         for i, (event_type, count) in enumerate(top_events, 1):
             logger.info("   %s. %s: %s раз", i, event_type, count)
         
@@ -105,6 +107,7 @@ async def _test_latency():
     logger.info("ТЕСТ 3: ИЗМЕРЕНИЕ LATENCY")
     logger.info("=" * 80)
     
+    checker = None
     try:
         checker = LatencyChecker()
         
@@ -121,6 +124,9 @@ async def _test_latency():
     except Exception as e:
         logger.error("Ошибка при измерении latency: %s", e, exc_info=True)
         return False, []
+    finally:
+        if checker is not None:
+            checker.close()
 
 
 async def _test_latency_save_and_retrieve():
@@ -130,6 +136,7 @@ async def _test_latency_save_and_retrieve():
     logger.info("ТЕСТ 4: СОХРАНЕНИЕ И ПОЛУЧЕНИЕ LATENCY")
     logger.info("=" * 80)
     
+    checker = None
     try:
         checker = LatencyChecker()
         
@@ -155,6 +162,9 @@ async def _test_latency_save_and_retrieve():
     except Exception as e:
         logger.error("Ошибка при работе с базой: %s", e, exc_info=True)
         return False, None
+    finally:
+        if checker is not None:
+            checker.close()
 
 
 def _test_report_preparation(top_events, max_latency):
@@ -197,27 +207,13 @@ async def _test_google_sheets_write(report_rows):
     logger.info("=" * 80)
     
     try:
-        logger.info("Получение текущего количества строк в таблице...")
-        initial_count = await sheets_writer.get_row_count()
-        logger.info("Количество строк до записи: %s", initial_count)
-        
-        headers = ["Дата", "Событие", "Кол-во", "Пиковая нагрузка (мс)", "Время пика"]
-        logger.info("Проверка заголовков таблицы...")
-        await sheets_writer.ensure_headers(headers)
-        logger.info("Заголовки установлены")
-        
-        logger.info("Запись %s строк в Google Sheets...", len(report_rows))
-        await sheets_writer.append_rows(report_rows)
-        
-        final_count = await sheets_writer.get_row_count()
-        logger.info("Количество строк после записи: %s", final_count)
-        
-        added_rows = final_count - initial_count
+        logger.info("Запись %s строк в Google Sheets (заголовки проверяются в том же обращении)...", len(report_rows))
+        added_rows = await sheets_writer.write_report(REPORT_HEADERS, report_rows)
         logger.info("Добавлено строк: %s", added_rows)
         
         if added_rows >= len(report_rows):
             logger.info("УСПЕШНО: Данные записаны в Google Sheets")
-            logger.info("Таблица ID: %s", settings.SHEETS_ID)
+            logger.info("Таблица ID: %s", get_settings().SHEETS_ID)
             return True
         else:
             logger.error("ОШИБКА: Не все строки были добавлены")
@@ -241,13 +237,14 @@ async def test_full_integration():
     logger.info("=" * 80)
     logger.info("")
     logger.info("Режим авторизации: %s", 
-               "Долгосрочный токен" if settings.AMO_LONG_LIVE_TOKEN else "OAuth2")
-    logger.info("Base URL: %s", settings.AMO_BASE_URL)
+               "Долгосрочный токен" if get_settings().AMO_LONG_LIVE_TOKEN else "OAuth2")
+    logger.info("Base URL: %s", get_settings().AMO_BASE_URL)
     logger.info("")
     
     results = {}
+    client = AmoCRMClient()
     
-    success, user_ids = await _test_users()
+    success, user_ids = await _test_users(client)
     results["users"] = success
     
     if not success:
@@ -255,7 +252,7 @@ async def test_full_integration():
         logger.error("Тест пользователей не прошёл. Останавливаем тестирование.")
         return False
     
-    success, events, top_events = await _test_events(user_ids)
+    success, events, top_events = await _test_events(client, user_ids)
     results["events"] = success
     
     success, latencies = await _test_latency()
@@ -293,12 +290,10 @@ async def test_full_integration():
         logger.info("")
         logger.info("Проект работает корректно!")
         logger.info("Можно запускать в production:")
-        logger.info("   1. poetry run python app/main_ping_probe.py")
-        logger.info("   2. poetry run python app/main_daily_report.py")
+        logger.info("   poetry run python -m app.main_daemon")
         logger.info("")
         logger.info("Или настроить systemd:")
-        logger.info("   sudo systemctl enable --now amocrm-ping-probe.timer")
-        logger.info("   sudo systemctl enable --now amocrm-daily-report.timer")
+        logger.info("   sudo systemctl enable --now amocrm-monitor.service")
         return True
     else:
         logger.info("=" * 80)
@@ -310,6 +305,6 @@ async def test_full_integration():
 
 
 if __name__ == "__main__":
-    success = asyncio.run(test_full_integration())
+    success = event_loop.run(test_full_integration())
     sys.exit(0 if success else 1)
 
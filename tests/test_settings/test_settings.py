@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import pytest
+
+from app.settings import get_settings
+
+
+@pytest.fixture
+def fresh_settings():
+    """Сброс кеша настроек до и после теста."""
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+class TestGetSettings:
+    """Тесты ленивой загрузки настроек."""
+
+    def test_cached(self, fresh_settings):
+        """Тест: повторный вызов возвращает тот же объект без повторного чтения окружения."""
+        assert get_settings() is get_settings()
+        assert get_settings.cache_info().misses == 1
+
+    def test_relative_service_account_path(self, fresh_settings, monkeypatch):
+        """Тест: относительный путь к service account преобразуется в абсолютный от корня проекта."""
+        monkeypatch.setenv("GOOGLE_SERVICE_ACCOUNT_PATH", "./secrets/sa.json")
+
+        path = Path(get_settings().GOOGLE_SERVICE_ACCOUNT_PATH)
+
+        assert path.is_absolute()
+        assert path == Path(__file__).parent.parent.parent / "secrets" / "sa.json"
+
+    def test_missing_required_field(self, fresh_settings, monkeypatch):
+        """Тест: ошибка валидации возникает при первом вызове, а не при импорте."""
+        monkeypatch.delenv("SHEETS_ID", raising=False)
+        monkeypatch.setattr("app.settings.Settings.model_config", {"env_file": None, "extra": "ignore"})
+
+        with pytest.raises(ValueError):
+            get_settings()
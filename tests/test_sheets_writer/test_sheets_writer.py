@@ -1,16 +1,20 @@
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
-from app.sheets_writer import SheetsWriter, sheets_writer
+from app.sheets_writer import REPORT_HEADERS, SheetsWriter, sheets_writer
 
 
 class TestSheetsWriterUnit:
     """Unit-тесты для SheetsWriter с моками."""
 
     @pytest.fixture
-    def writer(self):
-        """Создание экземпляра SheetsWriter для тестов."""
-        return SheetsWriter()
+    def writer(self, tmp_path):
+        """Создание экземпляра SheetsWriter для тестов (маркеры заголовков во временной папке)."""
+        writer = SheetsWriter()
+        writer.cache_dir = tmp_path
+        return writer
 
     def test_init(self, writer):
         """Тест инициализации SheetsWriter."""
@@ -70,6 +74,24 @@ class TestSheetsWriterUnit:
         mock_authorize.assert_called_once_with(mock_creds)
         mock_client.open_by_key.assert_called_once_with(writer.spreadsheet_id)
 
+    @pytest.mark.asyncio
+    @patch.object(SheetsWriter, "_get_worksheet")
+    async def test_ensure_worksheet_once(self, mock_get_worksheet, writer):
+        """Тест: параллельные обращения открывают лист один раз, дальше он берется из атрибута."""
+        mock_sheet = MagicMock()
+
+        def open_sheet():
+            writer._worksheet = mock_sheet
+            return mock_sheet
+
+        mock_get_worksheet.side_effect = open_sheet
+
+        results = await asyncio.gather(*(writer._ensure_worksheet() for _ in range(5)))
+
+        assert results == [mock_sheet] * 5
+        assert await writer._ensure_worksheet() is mock_sheet
+        mock_get_worksheet.assert_called_once()
+
     @patch.object(SheetsWriter, "_get_worksheet")
     @pytest.mark.asyncio
     async def test_append_rows_success(self, mock_get_worksheet, writer):
@@ -132,9 +154,11 @@ class TestSheetsWriterUnit:
         mock_worksheet.row_values.return_value = headers
         mock_get_worksheet.return_value = mock_worksheet
 
+        await writer.ensure_headers(headers)
         await writer.ensure_headers(headers)
 
         mock_worksheet.update.assert_not_called()
+        mock_worksheet.row_values.assert_called_once_with(1)
 
     @patch.object(SheetsWriter, "_get_worksheet")
     @pytest.mark.asyncio
@@ -150,24 +174,147 @@ class TestSheetsWriterUnit:
 
         mock_worksheet.update.assert_called_once_with([headers], "A1")
 
+    @patch.object(SheetsWriter, "_get_worksheet")
+    @pytest.mark.asyncio
+    async def test_ensure_headers_report_headers_tuple(self, mock_get_worksheet, writer):
+        """Тест: кортеж REPORT_HEADERS совпадает со списком из первой строки таблицы."""
+        mock_worksheet = MagicMock()
+        mock_worksheet.row_values.return_value = list(REPORT_HEADERS)
+        mock_get_worksheet.return_value = mock_worksheet
+
+        await writer.ensure_headers(REPORT_HEADERS)
+
+        mock_worksheet.update.assert_not_called()
+        assert writer._headers_marked(list(REPORT_HEADERS))
+
+    @patch.object(SheetsWriter, "_get_worksheet")
+    @pytest.mark.asyncio
+    async def test_write_report_empty_sheet(self, mock_get_worksheet, writer):
+        """Тест: в пустую таблицу заголовки и строки пишутся одним batch-запросом."""
+        mock_worksheet = MagicMock()
+        mock_worksheet.title = "Sheet1"
+        mock_worksheet.row_values.return_value = []
+        mock_worksheet.get_values.return_value = []
+        mock_worksheet.spreadsheet.values_batch_update.return_value = {"totalUpdatedRows": 2}
+        mock_get_worksheet.return_value = mock_worksheet
+
+        headers = ["Дата", "Событие", "Кол-во", "Пиковая нагрузка (мс)", "Время пика"]
+        rows = [["11.11.2025", "Событие 1", 100, 50, "10:00"]]
+
+        written = await writer.write_report(headers, rows)
+
+        assert written == 1
+        mock_worksheet.spreadsheet.values_batch_update.assert_called_once()
+        body = mock_worksheet.spreadsheet.values_batch_update.call_args[0][0]
+        assert body["data"][0] == {"range": "'Sheet1'!A1", "values": [headers]}
+        assert body["data"][1] == {"range": "'Sheet1'!A2", "values": rows}
+        mock_worksheet.append_rows.assert_not_called()
+        mock_worksheet.update.assert_not_called()
+
+    @patch.object(SheetsWriter, "_get_worksheet")
+    @pytest.mark.asyncio
+    async def test_write_report_headers_cleared_data_kept(self, mock_get_worksheet, writer):
+        """Тест: если очищена только строка заголовков, данные ниже не перезаписываются."""
+        headers = ["Дата", "Событие", "Кол-во", "Пиковая нагрузка (мс)", "Время пика"]
+        rows = [["12.11.2025", "Событие 1", 100, 50, "10:00"]]
+
+        mock_worksheet = MagicMock()
+        mock_worksheet.row_values.return_value = []
+        mock_worksheet.get_values.return_value = [["11.11.2025"]]
+        mock_get_worksheet.return_value = mock_worksheet
+
+        await writer.write_report(headers, rows)
+
+        mock_worksheet.spreadsheet.values_batch_update.assert_not_called()
+        mock_worksheet.update.assert_called_once_with([headers], "A1")
+        mock_worksheet.append_rows.assert_called_once_with(rows, value_input_option="USER_ENTERED")
+
+    @patch.object(SheetsWriter, "_get_worksheet")
+    @pytest.mark.asyncio
+    async def test_write_report_headers_set(self, mock_get_worksheet, writer):
+        """Тест: при совпадающих заголовках строки только добавляются в конец."""
+        headers = ["Дата", "Событие", "Кол-во", "Пиковая нагрузка (мс)", "Время пика"]
+        rows = [["11.11.2025", "Событие 1", 100, 50, "10:00"]]
+
+        mock_worksheet = MagicMock()
+        mock_worksheet.row_values.return_value = headers
+        mock_worksheet.append_rows.return_value = {"updates": {"updatedRows": 1}}
+        mock_get_worksheet.return_value = mock_worksheet
+
+        written = await writer.write_report(headers, rows)
+
+        assert written == 1
+        mock_worksheet.append_rows.assert_called_once_with(rows, value_input_option="USER_ENTERED")
+        mock_worksheet.update.assert_not_called()
+        mock_worksheet.spreadsheet.values_batch_update.assert_not_called()
+
+    @patch.object(SheetsWriter, "_get_worksheet")
+    @pytest.mark.asyncio
+    async def test_write_report_headers_different(self, mock_get_worksheet, writer):
+        """Тест: устаревшие заголовки перезаписываются, строки добавляются в конец."""
+        headers = ["Дата", "Событие", "Кол-во", "Пиковая нагрузка (мс)", "Время пика"]
+        rows = [["11.11.2025", "Событие 1", 100, 50, "10:00"]]
+
+        mock_worksheet = MagicMock()
+        mock_worksheet.row_values.return_value = ["Старый", "Заголовок"]
+        mock_get_worksheet.return_value = mock_worksheet
+
+        await writer.write_report(headers, rows)
+
+        mock_worksheet.update.assert_called_once_with([headers], "A1")
+        mock_worksheet.append_rows.assert_called_once_with(rows, value_input_option="USER_ENTERED")
+
+    @patch.object(SheetsWriter, "_get_worksheet")
+    @pytest.mark.asyncio
+    async def test_write_report_headers_marker(self, mock_get_worksheet, writer):
+        """Тест: после первой записи маркер заголовков позволяет не запрашивать первую строку."""
+        headers = ["Дата", "Событие", "Кол-во", "Пиковая нагрузка (мс)", "Время пика"]
+        rows = [["11.11.2025", "Событие 1", 100, 50, "10:00"]]
+
+        mock_worksheet = MagicMock()
+        mock_worksheet.row_values.return_value = headers
+        mock_get_worksheet.return_value = mock_worksheet
+
+        await writer.write_report(headers, rows)
+        await writer.write_report(headers, rows)
+
+        mock_worksheet.row_values.assert_called_once_with(1)
+        assert mock_worksheet.append_rows.call_count == 2
+        assert writer._headers_marker_path().exists()
+
+    @patch.object(SheetsWriter, "_get_worksheet")
+    @pytest.mark.asyncio
+    async def test_write_report_stale_headers_marker(self, mock_get_worksheet, writer):
+        """Тест: маркер для других заголовков не принимается, заголовки проверяются заново."""
+        headers = ["Дата", "Событие", "Кол-во", "Пиковая нагрузка (мс)", "Время пика"]
+        rows = [["11.11.2025", "Событие 1", 100, 50, "10:00"]]
+        writer._mark_headers(["Старый", "Заголовок"])
+
+        mock_worksheet = MagicMock()
+        mock_worksheet.row_values.return_value = ["Старый", "Заголовок"]
+        mock_get_worksheet.return_value = mock_worksheet
+
+        await writer.write_report(headers, rows)
+
+        mock_worksheet.update.assert_called_once_with([headers], "A1")
+        assert writer._headers_marked(headers)
+
     @patch.object(SheetsWriter, "_get_worksheet")
     @pytest.mark.asyncio
     async def test_get_row_count(self, mock_get_worksheet, writer):
         """Тест получения количества строк."""
         mock_worksheet = MagicMock()
-        mock_worksheet.get_all_values.return_value = [
-            ["header1", "header2"],
-            ["row1", "data1"],
-            ["row2", "data2"],
-        ]
+        mock_worksheet.col_values.return_value = ["header1", "row1", "row2"]
         mock_get_worksheet.return_value = mock_worksheet
 
         count = await writer.get_row_count()
 
         assert count == 3
-        mock_worksheet.get_all_values.assert_called_once()
+        mock_worksheet.col_values.assert_called_once_with(1)
+        mock_worksheet.get_all_values.assert_not_called()
 
 
+@pytest.mark.usefixtures("sheets_credentials")
 class TestSheetsWriterIntegration:
     """
     Интеграционный тест для записи в Google Sheets.
@@ -208,11 +355,9 @@ class TestSheetsWriterIntegration:
             [test_date, "TEST: Событие 5", 60, "", ""],
         ]
 
-        headers = ["Дата", "Событие", "Кол-во", "Пиковая нагрузка (мс)", "Время пика"]
-
         initial_count = await sheets_writer.get_row_count()
 
-        await sheets_writer.ensure_headers(headers)
+        await sheets_writer.ensure_headers(REPORT_HEADERS)
 
         await sheets_writer.append_rows(test_rows)
 